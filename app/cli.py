@@ -0,0 +1,140 @@
+# app/cli.py
+# Headless entry point for unattended runs (cron, servers without a display):
+#   python -m app.cli [--db path] import FILE|DIR|GLOB ... [--date D | --from D --to D] [--force]
+#   python -m app.cli [--db path] cluster [--mode incremental|full|partial_fit] [--backend exact1d|kmeans]
+#   python -m app.cli [--db path] cluster --mode grouped [--group-by aplikasi,depo,tipe]
+#                                 [--features duration,lag,start_hour] [--workers N]
+#   python -m app.cli [--db path] export-excel OUT.xlsx|.csv|.parquet [filters]
+#   python -m app.cli [--db path] export-pdf OUT.pdf [filters] [--compact]
+#   python -m app.cli [--db path] summary [filters] [--by tanggal,aplikasi,cluster]
+# filters: --from D --to D --aplikasi NAME --cluster N
+# Every command imports only what it uses: nothing here loads Qt or matplotlib,
+# and ReportLab is loaded by export-pdf only (see benchmarks/cli_startup.py).
+import sys
+import json
+import argparse
+import logging
+
+def _filters(args):
+    filters = {'date_from': args.date_from, 'date_to': args.date_to,
+               'aplikasi': args.aplikasi, 'cluster': args.cluster}
+    return {k: v for k, v in filters.items() if v is not None} or None
+
+def cmd_import(args):
+    from app.models.importer import import_files, expand_paths
+    if args.date and (args.date_from or args.date_to):
+        raise ValueError("use either --date or --from/--to")
+    if bool(args.date_from) != bool(args.date_to):
+        raise ValueError("--from and --to go together")
+    date_filter = args.date or ((args.date_from, args.date_to) if args.date_from else None)
+    if not expand_paths(args.paths):
+        raise ValueError("no importable files in " + ", ".join(args.paths))
+    res = import_files(args.paths, sheet_name=args.sheet, date_filter=date_filter,
+                       workers=args.workers, force=args.force)
+    for f in res['files']:
+        if f['error']:
+            status = "error: " + f['error']
+        elif f['skipped']:
+            status = "skipped (already imported)"
+        else:
+            status = f"{f['rows']} rows, {f['rejects']} without tanggal, template {f['template']}"
+        print(f"{f['path']}: {status}")
+    print(f"{res['rows']} rows imported in {res['seconds']:.2f}s")
+    return 1 if any(f['error'] for f in res['files']) else 0
+
+def cmd_cluster(args):
+    from app.models.clustering import run_kmeans_and_save
+    res = run_kmeans_and_save(mode=args.mode, backend=args.backend, group_by=args.group_by.split(","),
+                              features=args.features.split(","), workers=args.workers)
+    print(json.dumps(res, default=str))
+    return 0
+
+def cmd_export_excel(args):
+    from app.controllers.report import export_report
+    rows = export_report(args.out, _filters(args))
+    print(f"{rows} rows -> {args.out}")
+    return 0
+
+def cmd_export_pdf(args):
+    from app.controllers.report import export_report_pdf
+    rows = export_report_pdf(args.out, _filters(args), title=args.title, compact=args.compact)
+    print(f"{rows} rows -> {args.out}")
+    return 0
+
+def cmd_summary(args):
+    from app.controllers.aktivitas import summarize_activities
+    df = summarize_activities(_filters(args), [g.strip() for g in args.by.split(",") if g.strip()])
+    if args.csv:
+        df.to_csv(sys.stdout, index=False)
+    else:
+        print(df.to_string(index=False) if not df.empty else "no rows")
+    return 0
+
+def _add_filters(p):
+    p.add_argument("--from", dest="date_from", metavar="YYYY-MM-DD")
+    p.add_argument("--to", dest="date_to", metavar="YYYY-MM-DD")
+    p.add_argument("--aplikasi")
+    p.add_argument("--cluster", type=int, choices=(1, 2, 3))
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="python -m app.cli", description="cluster-daily without the GUI")
+    ap.add_argument("--db", help="database file (default app/data/aktivitas.db)")
+    ap.add_argument("-v", "--verbose", action="store_true", help="log import/clustering details")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import", help="import scheduler exports (files, directories or globs)")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--date", metavar="YYYY-MM-DD", help="only rows of this day")
+    p.add_argument("--from", dest="date_from", metavar="YYYY-MM-DD")
+    p.add_argument("--to", dest="date_to", metavar="YYYY-MM-DD")
+    p.add_argument("--sheet", help="Excel sheet name (default: first sheet)")
+    p.add_argument("--workers", type=int, help="parser processes (default: one per CPU)")
+    p.add_argument("--force", action="store_true", help="re-import files already imported")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("cluster", help="run K-Means and store the labels")
+    p.add_argument("--mode", default="incremental", choices=("incremental", "full", "partial_fit", "grouped"))
+    p.add_argument("--backend", default="exact1d", choices=("exact1d", "kmeans"))
+    p.add_argument("--group-by", default="aplikasi", help="grouped mode: comma separated aplikasi,depo,tipe")
+    p.add_argument("--features", default="duration", help="grouped mode: comma separated duration,lag,start_hour (duration required)")
+    p.add_argument("--workers", type=int, help="grouped mode: fitting processes (default: one per CPU)")
+    p.set_defaults(func=cmd_cluster)
+
+    p = sub.add_parser("export-excel", help="export the report (.xlsx, .csv or .parquet by extension)")
+    p.add_argument("out")
+    _add_filters(p)
+    p.set_defaults(func=cmd_export_excel)
+
+    p = sub.add_parser("export-pdf", help="export the report as PDF")
+    p.add_argument("out")
+    _add_filters(p)
+    p.add_argument("--title", default="Activity Report")
+    p.add_argument("--compact", action="store_true", help="landscape, main columns only (default: every column)")
+    p.set_defaults(func=cmd_export_pdf)
+
+    p = sub.add_parser("summary", help="print counts and duration stats")
+    _add_filters(p)
+    p.add_argument("--by", default="tanggal,aplikasi,cluster", help="comma separated group columns")
+    p.add_argument("--csv", action="store_true", help="CSV instead of a text table")
+    p.set_defaults(func=cmd_summary)
+    return ap
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    from app.models import db
+    if args.db:
+        from pathlib import Path
+        db.DB_PATH = Path(args.db)
+    db.init_db()
+    try:
+        return args.func(args)
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close_connection()
+
+if __name__ == "__main__":
+    sys.exit(main())
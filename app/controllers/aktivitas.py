@@ -1,88 +1,200 @@
 # app/controllers/aktivitas.py
-from app.models.db import get_connection
+from app.models.db import get_connection, transaction, AKTIVITAS_COLUMNS
+from app.models import summary, colcache
+from app.models.timestamps import (DAY_COLUMNS, EPOCH_COLUMNS, text_select,
+                                   to_day, to_epoch, from_day, from_epoch)
+from app.utils.metrics import timed
 import pandas as pd
 
+ACTIVITY_FIELDS = ['tanggal', 'aplikasi', 'depo', 'tipe', 'collection', 'object',
+                   'start_scheduler', 'finish_scheduler', 'start_bridge', 'finish_bridge',
+                   'duration_minutes', 'status', 'notes', 'scheduled_at']
+
+def _typed(record):
+    # form values (text) -> the integer day number / epoch seconds stored in aktivitas
+    values = []
+    for f in ACTIVITY_FIELDS:
+        v = record.get(f)
+        if f in DAY_COLUMNS:
+            v = to_day(v)
+        elif f in EPOCH_COLUMNS:
+            v = to_epoch(v)
+        values.append(v)
+    return values
+
+@timed('activity.insert')
 def insert_activity(record: dict):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO aktivitas (
-            tanggal, aplikasi, depo, tipe, collection, object,
-            start_scheduler, finish_scheduler, start_bridge, finish_bridge,
-            duration_minutes, status, notes, scheduled_at
-        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-    """, (
-        record.get('tanggal'),
-        record.get('aplikasi'),
-        record.get('depo'),
-        record.get('tipe'),
-        record.get('collection'),
-        record.get('object'),
-        record.get('start_scheduler'),
-        record.get('finish_scheduler'),
-        record.get('start_bridge'),
-        record.get('finish_bridge'),
-        record.get('duration_minutes'),
-        record.get('status'),
-        record.get('notes'),
-        record.get('scheduled_at')
-    ))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("""
+            INSERT INTO aktivitas (
+                tanggal, aplikasi, depo, tipe, collection, object,
+                start_scheduler, finish_scheduler, start_bridge, finish_bridge,
+                duration_minutes, status, notes, scheduled_at
+            ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+        """, _typed(record))
+        summary.mark(conn, [(to_day(record.get('tanggal')), record.get('aplikasi'))])
+        summary.refresh(conn)
 
+@timed('activity.update')
 def update_activity(id_, record: dict):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        UPDATE aktivitas SET
-            tanggal=?, aplikasi=?, depo=?, tipe=?, collection=?, object=?,
-            start_scheduler=?, finish_scheduler=?, start_bridge=?, finish_bridge=?, duration_minutes=?, status=?, notes=?, scheduled_at=?
-        WHERE id=?
-    """, (
-        record.get('tanggal'),
-        record.get('aplikasi'),
-        record.get('depo'),
-        record.get('tipe'),
-        record.get('collection'),
-        record.get('object'),
-        record.get('start_scheduler'),
-        record.get('finish_scheduler'),
-        record.get('start_bridge'),
-        record.get('finish_bridge'),
-        record.get('duration_minutes'),
-        record.get('status'),
-        record.get('notes'),
-        record.get('scheduled_at'),
-        id_
-    ))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        summary.mark_query(conn, "SELECT tanggal, aplikasi FROM aktivitas WHERE id=?", (id_,))
+        conn.execute("""
+            UPDATE aktivitas SET
+                tanggal=?, aplikasi=?, depo=?, tipe=?, collection=?, object=?,
+                start_scheduler=?, finish_scheduler=?, start_bridge=?, finish_bridge=?, duration_minutes=?, status=?, notes=?, scheduled_at=?
+            WHERE id=?
+        """, _typed(record) + [id_])
+        summary.mark(conn, [(to_day(record.get('tanggal')), record.get('aplikasi'))])
+        summary.refresh(conn)
+        colcache.touch(conn)
 
+@timed('activity.delete')
 def delete_activity(id_):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM aktivitas WHERE id=?", (id_,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        summary.mark_query(conn, "SELECT tanggal, aplikasi FROM aktivitas WHERE id=?", (id_,))
+        conn.execute("DELETE FROM aktivitas WHERE id=?", (id_,))
+        summary.refresh(conn)
+        colcache.touch(conn)
 
-def list_activities(filters=None):
-    conn = get_connection()
-    q = "SELECT * FROM aktivitas WHERE 1=1"
+def _filter_sql(filters):
+    q = ""
     params = []
     if filters:
         if filters.get('date_from'):
             q += " AND tanggal >= ?"
-            params.append(filters['date_from'])
+            params.append(to_day(filters['date_from']))
         if filters.get('date_to'):
             q += " AND tanggal <= ?"
-            params.append(filters['date_to'])
+            params.append(to_day(filters['date_to']))
         if filters.get('aplikasi'):
             q += " AND aplikasi = ?"
             params.append(filters['aplikasi'])
         if filters.get('cluster'):
             q += " AND cluster = ?"
             params.append(filters['cluster'])
-    q += " ORDER BY tanggal DESC, id DESC"
-    df = pd.read_sql_query(q, conn, params=params)
-    conn.close()
+    return q, params
+
+def activities_query(filters=None, select="*"):
+    """(sql, params) of list_activities; each filter combination is served by an index"""
+    where, params = _filter_sql(filters)
+    # qualified: ORDER BY would otherwise pick up a text-form "tanggal" alias and sort without the index
+    return f"SELECT {select} FROM aktivitas WHERE 1=1" + where + " ORDER BY aktivitas.tanggal DESC, id DESC", params
+
+@timed('query.list', rows=len)
+def list_activities(filters=None):
+    """All matching rows; tanggal and the scheduler/bridge times as datetime64 columns"""
+    q, params = activities_query(filters)
+    df = pd.read_sql_query(q, get_connection(), params=params)
+    for c in DAY_COLUMNS:
+        df[c] = from_day(df[c])
+    for c in EPOCH_COLUMNS:
+        df[c] = from_epoch(df[c])
     return df
+
+def list_aplikasi():
+    """Distinct aplikasi values (from the aplikasi_lookup table)"""
+    rows = get_connection().execute("SELECT aplikasi FROM aplikasi_lookup ORDER BY aplikasi").fetchall()
+    return [r[0] for r in rows]
+
+@timed('query.cluster_points', rows=len)
+def cluster_points(filters=None):
+    """id, duration_minutes, cluster only (for the cluster plot); NULLs come back as NaN"""
+    # called on the GUI thread: never queue behind a running import / clustering
+    cols = colcache.load(wait=False)
+    if cols is not None:
+        m = cols.mask(filters)
+        dur, cluster = cols['duration_minutes'][m], cols['cluster'][m]
+        return pd.DataFrame({'id': cols['id'][m],
+                             'duration_minutes': pd.Series(dur).where(dur != colcache.MISSING),
+                             'cluster': pd.Series(cluster).where(cluster != 0)})
+    where, params = _filter_sql(filters)
+    q = "SELECT id, duration_minutes, cluster FROM aktivitas WHERE 1=1" + where
+    return pd.read_sql_query(q, get_connection(), params=params)
+
+@timed('query.count')
+def count_activities(filters=None):
+    where, params = _filter_sql(filters)
+    return get_connection().execute("SELECT COUNT(*) FROM aktivitas WHERE 1=1" + where, params).fetchone()[0]
+
+@timed('query.page', rows=lambda res: len(res[1]))
+def fetch_activities_page(filters=None, after=None, limit=500):
+    """
+    One keyset-paginated window in list_activities order (tanggal DESC, id DESC).
+    after: (tanggal, id) of the last row of the previous window, None for the first
+    Returns (columns, rows) with rows as tuples, dates/times in their text form
+    """
+    where, params = _filter_sql(filters)
+    base = f"SELECT {text_select(AKTIVITAS_COLUMNS)} FROM aktivitas WHERE 1=1" + where
+    if after is not None:
+        after = (to_day(after[0]), after[1])
+    conn = get_connection()
+    rows = []
+    cur = None
+    # dated rows first; the bound is a plain range on tanggal so the index seeks
+    # straight to the window instead of skipping the rows already shown
+    if after is None or after[0] is not None:
+        q, p = base, list(params)
+        if after is not None:
+            q += " AND tanggal <= ? AND (tanggal < ? OR id < ?)"
+            p += [after[0], after[0], after[1]]
+        else:
+            q += " AND tanggal IS NOT NULL"
+        cur = conn.execute(q + " ORDER BY aktivitas.tanggal DESC, id DESC LIMIT ?", p + [limit])
+        rows = cur.fetchall()
+    # NULL dates sort last in DESC order
+    if len(rows) < limit:
+        q, p = base + " AND tanggal IS NULL", list(params)
+        if after is not None and after[0] is None:
+            q += " AND id < ?"
+            p.append(after[1])
+        cur = conn.execute(q + " ORDER BY id DESC LIMIT ?", p + [limit - len(rows)])
+        rows += cur.fetchall()
+    columns = [d[0] for d in cur.description]
+    return columns, [tuple(r) for r in rows]
+
+def iter_activities(filters=None, columns=None, chunk=5000):
+    """
+    Stream list_activities' result from the cursor, dates/times in their text form.
+    columns: optional subset of column names (default all)
+    Returns (column_names, chunks) where chunks yields lists of at most chunk row tuples
+    """
+    q, params = activities_query(filters, text_select(columns or AKTIVITAS_COLUMNS))
+    cur = get_connection().execute(q, params)
+    names = [d[0] for d in cur.description]
+
+    def chunks():
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                break
+            yield [tuple(r) for r in rows]
+
+    return names, chunks()
+
+# columns summarize_activities can group by
+SUMMARY_GROUPS = ('tanggal', 'aplikasi', 'cluster')
+
+@timed('query.summary', rows=len)
+def summarize_activities(filters=None, group_by=SUMMARY_GROUPS):
+    """
+    Counts and duration stats from the aktivitas_summary table (no raw row scan).
+    filters: same dict as list_activities; group_by: subset of SUMMARY_GROUPS
+    Returns a DataFrame with the group columns + count, total/min/max/avg_duration
+    """
+    group_by = [g for g in group_by if g in SUMMARY_GROUPS]
+    where, params = _filter_sql(filters)
+    if filters and (filters.get('date_from') or filters.get('date_to')):
+        where += " AND tanggal <> -1"
+    cols = {'tanggal': "date(NULLIF(tanggal,-1) * 86400, 'unixepoch') AS tanggal", 'aplikasi': "NULLIF(aplikasi,'') AS aplikasi",
+            'cluster': "NULLIF(cluster,0) AS cluster"}
+    select = [cols[g] for g in group_by]
+    q = ("SELECT " + ", ".join(select + [
+            "SUM(n) AS count", "SUM(total_duration) AS total_duration",
+            "MIN(min_duration) AS min_duration", "MAX(max_duration) AS max_duration",
+            "ROUND(1.0 * SUM(total_duration) / SUM(n), 2) AS avg_duration"])
+         + " FROM aktivitas_summary WHERE 1=1" + where)
+    if group_by:
+        q += " GROUP BY " + ", ".join(str(i + 1) for i in range(len(group_by)))
+        q += " ORDER BY " + ", ".join(f"{i + 1} DESC" if g == 'tanggal' else str(i + 1) for i, g in enumerate(group_by))
+    return pd.read_sql_query(q, get_connection(), params=params)
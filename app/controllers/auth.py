@@ -1,38 +1,123 @@
 # app/controllers/auth.py
-from app.models.db import get_connection
-import bcrypt
+# Password hashing is slow on purpose (bcrypt), so the GUI calls authenticate /
+# register_user from a WorkerThread. A successful login returns the user with a
+# session token; for a while after that, privileged actions can be confirmed with
+# session_user(token) instead of another bcrypt check.
+#
+# AKTIVITAS_BCRYPT_ROUNDS   bcrypt cost for new hashes (default 12); stored
+#                           hashes with another cost are rehashed at the next login
+import os
+import hmac
+import time
+import secrets
+import threading
 from typing import Optional
+from app.models.db import get_connection, transaction
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+BCRYPT_ROUNDS = int(os.environ.get("AKTIVITAS_BCRYPT_ROUNDS", "12"))
+# seconds a verified session stands in for the password
+SESSION_TTL = 10 * 60
+
+USER_COLUMNS = ("id", "username", "role", "nama", "nip", "email")
+ROLES = ("admin", "leader", "programmer")
+
+_sessions = {}   # token -> (user, expires at, time.monotonic)
+_lock = threading.Lock()
+_dummy = {}
+
+def hash_password(password: str, rounds: int = None) -> str:
+    import bcrypt
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds or BCRYPT_ROUNDS)).decode('utf-8')
+
+def is_hashed(stored: str) -> bool:
+    return stored.startswith(("$2a$", "$2b$", "$2y$"))
+
+def hash_rounds(stored: str) -> Optional[int]:
+    """bcrypt cost of a stored hash, None for legacy (plaintext) values"""
+    try:
+        return int(stored.split("$")[2]) if is_hashed(stored) else None
+    except (IndexError, ValueError):
+        return None
+
+def needs_rehash(stored: str) -> bool:
+    return hash_rounds(stored) != BCRYPT_ROUNDS
 
 def verify_password(password: str, hashed: str) -> bool:
     try:
+        import bcrypt
         return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
     except Exception:
         return False
 
+def _check(password, stored):
+    if is_hashed(stored):
+        return verify_password(password, stored)
+    # legacy rows (e.g. the admin seeded by init_db) hold the password itself
+    return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+
+def _dummy_hash():
+    # unknown usernames still pay one bcrypt check, so they take as long as wrong passwords
+    if BCRYPT_ROUNDS not in _dummy:
+        _dummy[BCRYPT_ROUNDS] = hash_password(secrets.token_hex(8))
+    return _dummy[BCRYPT_ROUNDS]
+
 def authenticate(username: str, password: str) -> Optional[dict]:
+    """
+    User dict (USER_COLUMNS + 'token') or None. Blocks for one bcrypt check (two when
+    the stored password is plaintext or of another cost and gets rehashed): call it
+    off the GUI thread.
+    """
     conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM users WHERE username=?", (username,))
-    row = cur.fetchone()
-    conn.close()
-    if row and verify_password(password, row["password"]):
-        return {"id": row["id"], "username":row["username"], "role":row["role"], "nama":row["nama"], "nip":row["nip"], "email":row["email"]}
-    return None
-
-def register_user(nip, nama, email, username, password, role):
-    if role not in ("admin","leader","programmer"):
+    row = conn.execute(f"SELECT {', '.join(USER_COLUMNS)}, password FROM users WHERE username=?",
+                       (username,)).fetchone()
+    if row is None:
+        verify_password(password, _dummy_hash())
+        return None
+    stored = row["password"] or ""
+    if not _check(password, stored):
+        return None
+    if needs_rehash(stored):
+        # only if nobody changed the password in between
+        with transaction() as conn:
+            conn.execute("UPDATE users SET password=? WHERE id=? AND password=?",
+                         (hash_password(password), row["id"], stored))
+    user = {c: row[c] for c in USER_COLUMNS}
+    user["token"] = start_session(user)
+    return user
+
+def start_session(user: dict) -> str:
+    token = secrets.token_urlsafe(32)
+    with _lock:
+        _sessions[token] = (dict(user), time.monotonic() + SESSION_TTL)
+    return token
+
+def session_user(token: Optional[str], roles=None) -> Optional[dict]:
+    """User of a live session token (and with a role in roles, if given), else None"""
+    now = time.monotonic()
+    with _lock:
+        for t in [t for t, (_, expires) in _sessions.items() if expires <= now]:
+            del _sessions[t]
+        user, _ = _sessions.get(token, (None, None))
+    if user is None or (roles and user["role"] not in roles):
+        return None
+    return dict(user)
+
+def end_session(token: Optional[str]):
+    with _lock:
+        _sessions.pop(token, None)
+
+def register_user(nip, nama, email, username, password, role, token=None):
+    """
+    token: session of the user doing the registration; when given it must be a live
+    admin session. Hashing blocks like authenticate does.
+    """
+    if role not in ROLES:
         raise ValueError("Invalid role")
+    if token is not None and session_user(token, roles=("admin",)) is None:
+        raise PermissionError("Registering users needs a live admin session (log in again)")
     hashed = hash_password(password)
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("""
+    with transaction() as conn:
+        conn.execute("""
             INSERT INTO users (nip,nama,email,username,password,role)
             VALUES (?,?,?,?,?,?)
         """, (nip, nama, email, username, hashed, role))
-        conn.commit()
-    finally:
-        conn.close()
@@ -1,11 +1,100 @@
 # app/controllers/report.py
-from app.controllers.aktivitas import list_activities
-from app.utils.export_pdf import export_df_to_pdf
+from app.controllers.aktivitas import iter_activities
+from app.models.db import check_cancelled
+from app.utils.metrics import timed
 
-def export_report_excel(path, filters=None):
-    df = list_activities(filters)
-    df.to_excel(path, index=False)
+# progress(rows) / cancelled() are the optional job hooks used by WorkerThread
 
-def export_report_pdf(path, filters=None, title="Activity Report"):
-    df = list_activities(filters)
-    export_df_to_pdf(df, path, title)
+# column subset for compact (landscape) PDF reports
+PDF_COMPACT_COLUMNS = ['tanggal', 'aplikasi', 'start_scheduler', 'finish_scheduler',
+                       'start_bridge', 'finish_bridge', 'duration_minutes', 'status', 'cluster']
+
+# sqlite INTEGER columns of aktivitas; everything else is exported as text
+INTEGER_COLUMNS = {'id', 'duration_minutes', 'cluster'}
+
+def _stream(filters, begin, write_chunk, progress=None, cancelled=None):
+    # begin(column names) once, then write_chunk(rows) per cursor chunk; returns rows written
+    names, chunks = iter_activities(filters)
+    begin(names)
+    rows = 0
+    for chunk in chunks:
+        check_cancelled(cancelled)
+        write_chunk(chunk)
+        rows += len(chunk)
+        if progress:
+            progress(rows)
+    return rows
+
+@timed('export.xlsx', rows=lambda n: n)
+def export_report_excel(path, filters=None, progress=None, cancelled=None):
+    """Constant-memory xlsx: rows go from the cursor to an openpyxl write-only sheet"""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Report")
+
+    def write(chunk):
+        for row in chunk:
+            ws.append(row)
+
+    rows = _stream(filters, ws.append, write, progress, cancelled)
+    wb.save(path)
+    return rows
+
+@timed('export.csv', rows=lambda n: n)
+def export_report_csv(path, filters=None, progress=None, cancelled=None):
+    import csv
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        return _stream(filters, writer.writerow, writer.writerows, progress, cancelled)
+
+@timed('export.parquet', rows=lambda n: n)
+def export_report_parquet(path, filters=None, progress=None, cancelled=None):
+    """Parquet written one row group per cursor chunk (needs pyarrow)"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    state = {}
+
+    def begin(names):
+        schema = pa.schema([(n, pa.int64() if n in INTEGER_COLUMNS else pa.string()) for n in names])
+        state['writer'] = pq.ParquetWriter(path, schema)
+
+    def write(chunk):
+        writer = state['writer']
+        cols = list(zip(*chunk))
+        writer.write_table(pa.table([pa.array(c, type=f.type) for c, f in zip(cols, writer.schema)],
+                                    schema=writer.schema))
+
+    try:
+        return _stream(filters, begin, write, progress, cancelled)
+    finally:
+        if 'writer' in state:
+            state['writer'].close()
+
+# export format by file extension
+EXPORTERS = {
+    '.xlsx': export_report_excel,
+    '.csv': export_report_csv,
+    '.parquet': export_report_parquet,
+}
+
+def export_report(path, filters=None, progress=None, cancelled=None):
+    """Export to xlsx/csv/parquet depending on the path's extension"""
+    ext = path[path.rfind('.'):].lower() if '.' in path else ''
+    if ext not in EXPORTERS:
+        raise ValueError(f"Unsupported export format: {ext or path}")
+    return EXPORTERS[ext](path, filters, progress=progress, cancelled=cancelled)
+
+@timed('export.pdf', rows=lambda n: n)
+def export_report_pdf(path, filters=None, title="Activity Report", compact=False, progress=None, cancelled=None):
+    """
+    Rows are streamed from the DB cursor into the PDF page by page.
+    compact: landscape page with PDF_COMPACT_COLUMNS only; default prints every column
+    """
+    # ReportLab is only loaded for PDF exports
+    from app.utils.export_pdf import export_rows_to_pdf
+    names, chunks = iter_activities(filters, PDF_COMPACT_COLUMNS if compact else None)
+    return export_rows_to_pdf(names, chunks, path, title, landscape_mode=compact,
+                              progress=progress, cancelled=cancelled)
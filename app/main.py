@@ -1,49 +1,60 @@
 # app/main.py
 import sys
-from PyQt5 import uic
-from PyQt5.QtWidgets import QApplication, QMainWindow, QDialog, QFileDialog, QMessageBox, QVBoxLayout
+from functools import partial
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QDialog, QFileDialog, QMessageBox, QVBoxLayout, QHBoxLayout,
+                             QShortcut, QAction, QComboBox, QPushButton, QTableView, QInputDialog, QLineEdit)
 from pathlib import Path
-from app.models.db import init_db, get_connection
-from app.models.importer import preview_file, import_from_file
-from app.models.clustering import run_kmeans_and_save as clustering_run
-from app.controllers.auth import authenticate, register_user
-from app.controllers.aktivitas import list_activities, insert_activity, update_activity, delete_activity
-from app.controllers.report import export_report_excel, export_report_pdf
-from app.utils.pandas_model import PandasModel
-from app.utils.plot_canvas import MplCanvas
-import pandas as pd
+from app.models.db import init_db
+from app.utils.paged_model import PagedTableModel
+from app.utils.ui_loader import load_ui
+from app.utils.worker import WorkerThread
+from app.utils import metrics
+# pandas (via the models/controllers), matplotlib, ReportLab and bcrypt are imported
+# where they are first used, so the login dialog and the main window come up without
+# them; benchmarks/gui_startup.py checks the import budget
 
 BASE = Path(__file__).resolve().parents[0]
-UI_DIR = BASE / "ui"
+
+def first_screen(filters, page_size, progress=None, cancelled=None):
+    """Runs on a worker once the window is shown: aplikasi list, report row count and first page"""
+    from app.controllers.aktivitas import list_aplikasi, count_activities, fetch_activities_page
+    return list_aplikasi(), count_activities(filters), fetch_activities_page(filters, None, page_size)
 
 class LoginDialog(QDialog):
     def __init__(self):
         super().__init__()
-        uic.loadUi(str(UI_DIR / "login.ui"), self)
+        load_ui("login.ui", self)
         self.btnLogin.clicked.connect(self.do_login)
         self.user = None
 
     def do_login(self):
+        from app.controllers.auth import authenticate
         username = self.leUsername.text().strip()
         password = self.lePassword.text().strip()
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM users WHERE username=?", (username,))
-        row = cur.fetchone()
-        conn.close()
-        if row:
-            # row['password'] is hashed — use verify from auth
-            from app.controllers.auth import verify_password
-            if verify_password(password, row['password']):
-                self.user = {"id":row["id"], "username":row["username"], "role":row["role"], "nama":row["nama"]}
-                self.accept()
-                return
-        QMessageBox.warning(self, "Login failed", "Username or password incorrect")
+        # bcrypt runs on a worker so the dialog keeps painting
+        self.btnLogin.setEnabled(False)
+        self.worker = WorkerThread(authenticate, username, password)
+        self.worker.finished.connect(self.login_done)
+        self.worker.start()
+
+    def login_done(self, res):
+        self.btnLogin.setEnabled(True)
+        if isinstance(res, dict) and "error" in res:
+            QMessageBox.critical(self, "Login failed", res["error"])
+        elif res:
+            self.user = res
+            self.accept()
+        else:
+            QMessageBox.warning(self, "Login failed", "Username or password incorrect")
 
 class RegisterDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, token=None):
+        """token: session of the admin registering users (see auth.session_user)"""
         super().__init__(parent)
-        uic.loadUi(str(UI_DIR / "form_register.ui"), self)
+        load_ui("form_register.ui", self)
+        self.token = token
         self.btnSave.clicked.connect(self.do_register)
 
     def do_register(self):
@@ -56,30 +67,80 @@ class RegisterDialog(QDialog):
         if not (nip and nama and email and username and password):
             QMessageBox.warning(self, "Error", "All fields are required")
             return
-        try:
-            register_user(nip, nama, email, username, password, role)
-            QMessageBox.information(self, "OK", "User registered")
-            self.accept()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
+        from app.controllers.auth import register_user
+        # hashing the new password runs on a worker
+        self.btnSave.setEnabled(False)
+        self.worker = WorkerThread(register_user, nip, nama, email, username, password, role,
+                                   token=self.token, writes_db=True)
+        self.worker.finished.connect(self.register_done)
+        self.worker.start()
+
+    def register_done(self, res):
+        self.btnSave.setEnabled(True)
+        if isinstance(res, dict) and "error" in res:
+            QMessageBox.critical(self, "Error", res["error"])
+            return
+        QMessageBox.information(self, "OK", "User registered")
+        self.accept()
+
+class PerformanceDialog(QDialog):
+    """Per-operation timings from the metrics table (see app/utils/metrics.py)"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Performance")
+        self.resize(900, 500)
+        self.cmbView = QComboBox()
+        self.cmbView.addItems(["Per operation", "Recent runs"])
+        self.cmbView.currentIndexChanged.connect(self.refresh)
+        btnRefresh = QPushButton("Refresh")
+        btnRefresh.clicked.connect(self.refresh)
+        btnClear = QPushButton("Clear")
+        btnClear.clicked.connect(self.clear)
+        bar = QHBoxLayout()
+        bar.addWidget(self.cmbView)
+        bar.addStretch()
+        bar.addWidget(btnRefresh)
+        bar.addWidget(btnClear)
+        from app.utils.pandas_model import PandasModel
+        self.model = PandasModel()
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSortingEnabled(True)
+        layout = QVBoxLayout(self)
+        layout.addLayout(bar)
+        layout.addWidget(self.table)
+        self.refresh()
+
+    def refresh(self):
+        self.model.update(metrics.summary() if self.cmbView.currentIndex() == 0 else metrics.recent())
+        self.table.resizeColumnsToContents()
+
+    def clear(self):
+        metrics.clear()
+        self.refresh()
 
 class MainWindow(QMainWindow):
     def __init__(self, user):
         super().__init__()
-        uic.loadUi(str(UI_DIR / "mainwindow.ui"), self)
+        load_ui("mainwindow.ui", self)
         self.user = user
-        # preview table model (import preview)
-        self.preview_df = pd.DataFrame()
-        self.model_preview = PandasModel(pd.DataFrame())
-        self.tvPreview.setModel(self.model_preview)
-        # report table
-        self.model_report = PandasModel(pd.DataFrame())
+        # preview table model (import preview), created with the first preview
+        self.preview_df = None
+        self.model_preview = None
+        self.tvPreview.setSortingEnabled(True)
+        # report table (pulled from the DB page by page while scrolling)
+        self.model_report = PagedTableModel()
         self.tvReport.setModel(self.model_report)
-        # plot canvas
-        self.canvas = MplCanvas(self.plotWidget, width=5, height=4, dpi=100)
-        if self.plotWidget.layout() is None:
-            self.plotWidget.setLayout(QVBoxLayout())
-        self.plotWidget.layout().addWidget(self.canvas)
+        # summary view: per day / aplikasi / cluster stats from aktivitas_summary
+        self.model_summary = None
+        self.actSummary = QAction("Summary view", self, checkable=True)
+        self.actSummary.toggled.connect(self.refresh_report_table)
+        toolbar = self.addToolBar("View")
+        toolbar.addAction(self.actSummary)
+        # timings recorded by app/utils/metrics.py
+        toolbar.addAction("Performance", lambda: PerformanceDialog(self).exec_())
+        # plot canvas, created with the first plot (matplotlib)
+        self.canvas = None
         # connect buttons
         self.btnBrowseFile.clicked.connect(self.browse_file)
         self.btnImport.clicked.connect(self.import_file_action)
@@ -88,24 +149,49 @@ class MainWindow(QMainWindow):
         self.btnExportPDF.clicked.connect(self.export_pdf_action)
         self.btnRegisterUser.clicked.connect(self.open_register_dialog)
         self.btnRefreshReport.clicked.connect(self.refresh_report_table)
+        # background jobs (import, clustering, exports)
+        self.jobs = []
+        QShortcut(QKeySequence(Qt.Key_Escape), self, activated=self.cancel_jobs)
         # hide register button if not admin
         if self.user['role'] != 'admin':
             self.btnRegisterUser.setVisible(False)
-        self.load_filters()
-        self.refresh_report_table()
+        # filters without the aplikasi list for now; the DB is first queried once
+        # the window is on screen (first_screen on a worker)
+        self.load_filters([])
+        QTimer.singleShot(0, self.load_first_screen)
+
+    def load_first_screen(self):
+        filters = self.get_filters()
+        self.start_job("Loading", first_screen, filters, self.model_report.page_size,
+                       on_done=partial(self.first_screen_done, filters))
+
+    def first_screen_done(self, filters, res):
+        apps, total, page = res
+        self.load_filters(apps)
+        # filters changed while loading: the prefetched page is stale
+        if self.actSummary.isChecked() or self.get_filters() != filters:
+            self.refresh_report_table()
+        else:
+            self.show_report(filters, first=(total, page))
 
     def browse_file(self):
-        path, _ = QFileDialog.getOpenFileName(self, "Select Excel/CSV", "", "Excel Files (*.xlsx *.xls);;CSV Files (*.csv)")
-        if not path: return
-        self.lblFilePath.setText(path)
-        df_preview, cols = preview_file(path)
-        self.preview_df = pd.read_excel(path) if path.lower().endswith(('.xls','.xlsx')) else pd.read_csv(path)
-        self.model_preview.update(self.preview_df.head(200))
-        QMessageBox.information(self, "Preview", f"Preview loaded ({len(self.preview_df)} rows). Choose date filter then Import.")
+        paths, _ = QFileDialog.getOpenFileNames(self, "Select Excel/CSV", "", "Excel Files (*.xlsx *.xls);;CSV Files (*.csv)")
+        if not paths: return
+        self.import_paths = paths
+        self.lblFilePath.setText(paths[0] if len(paths) == 1 else f"{len(paths)} files: {', '.join(Path(p).name for p in paths)}")
+        # only the first rows (of the first file) are read; files are streamed on import
+        from app.models.importer import preview_file
+        self.preview_df, cols = preview_file(paths[0], nrows=200)
+        if self.model_preview is None:
+            from app.utils.pandas_model import PandasModel
+            self.model_preview = PandasModel()
+            self.tvPreview.setModel(self.model_preview)
+        self.model_preview.update(self.preview_df)
+        QMessageBox.information(self, "Preview", f"Preview loaded (first {len(self.preview_df)} rows). Choose date filter then Import.")
 
     def import_file_action(self):
-        path = self.lblFilePath.text().strip()
-        if not path:
+        paths = getattr(self, 'import_paths', None) or [p for p in [self.lblFilePath.text().strip()] if p]
+        if not paths:
             QMessageBox.warning(self, "No file selected", "Please select a file first")
             return
         date_from = self.importFrom.date().toString("yyyy-MM-dd") if hasattr(self, 'importFrom') and self.importFrom.date() else None
@@ -115,46 +201,173 @@ class MainWindow(QMainWindow):
             date_filter = (date_from, date_to)
         elif date_from:
             date_filter = date_from
-        count = import_from_file(path, date_filter=date_filter)
+        self.start_import(paths, date_filter)
+
+    def start_import(self, paths, date_filter, force=False):
+        from app.models.importer import import_from_file, import_files
+        if len(paths) > 1:
+            # parsed in parallel worker processes, written by this job only
+            self.start_job("Import", import_files, paths, date_filter=date_filter, force=force, writes_db=True,
+                           on_done=partial(self.import_files_done, date_filter=date_filter))
+            return
+        self.start_job("Import", import_from_file, paths[0], date_filter=date_filter, force=force, writes_db=True,
+                       on_done=partial(self.import_done, paths[0], date_filter))
+
+    def confirm_reimport(self, text):
+        return QMessageBox.question(self, "Import", text + "\nImport again? Rows already stored are updated.",
+                                    QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes
+
+    def import_done(self, path, date_filter, count):
+        if count is None:
+            # same file content and date filter as an earlier import
+            if self.confirm_reimport(f"{Path(path).name}: skipped (already imported)."):
+                self.start_import([path], date_filter, force=True)
+            return
         QMessageBox.information(self, "Import", f"{count} rows imported.")
         self.load_filters()
         self.refresh_report_table()
 
+    def import_files_done(self, res, date_filter=None):
+        lines = []
+        for st in res['files']:
+            name = Path(st['path']).name
+            if st['skipped']:
+                lines.append(f"{name}: skipped (already imported)")
+            elif st['error']:
+                lines.append(f"{name}: error - {st['error']}")
+            else:
+                lines.append(f"{name}: {st['rows']} rows, {st['filtered']} filtered, {st['rejects']} without date "
+                             f"(parse {st['parse_seconds']:.1f}s, write {st['write_seconds']:.1f}s)")
+        QMessageBox.information(self, "Import", f"{res['rows']} rows imported in {res['seconds']:.1f}s.\n\n" + "\n".join(lines))
+        self.load_filters()
+        self.refresh_report_table()
+        skipped = [st['path'] for st in res['files'] if st['skipped']]
+        if skipped and self.confirm_reimport(f"{len(skipped)} file(s) skipped (already imported)."):
+            self.start_import(skipped, date_filter, force=True)
+
     def run_clustering_action(self):
+        # new rows are assigned to the stored model; Shift+click forces a full refit,
+        # Ctrl+click refits each aplikasi on its own (grouped mode)
+        modifiers = QApplication.keyboardModifiers()
+        mode = ("grouped" if modifiers & Qt.ControlModifier else
+                "full" if modifiers & Qt.ShiftModifier else "incremental")
         from app.models.clustering import run_kmeans_and_save
-        res = run_kmeans_and_save()
+        self.start_job("Clustering", run_kmeans_and_save, mode=mode,
+                       writes_db=True, on_done=self.clustering_done)
+
+    def clustering_done(self, res):
         QMessageBox.information(self, "Clustering", f"Result: {res}")
         self.refresh_report_table()
         self.plot_clusters()
 
     def export_excel_action(self):
-        path, _ = QFileDialog.getSaveFileName(self, "Save Excel", "report.xlsx", "Excel Files (*.xlsx)")
+        path, _ = QFileDialog.getSaveFileName(self, "Save Report", "report.xlsx",
+                                              "Excel Files (*.xlsx);;CSV Files (*.csv);;Parquet Files (*.parquet)")
         if not path: return
         filters = self.get_filters()
-        export_report_excel(path, filters)
-        QMessageBox.information(self, "Saved", f"Saved to {path}")
+        from app.controllers.report import export_report
+        # format follows the chosen extension (xlsx / csv / parquet)
+        self.start_job("Export", export_report, path, filters,
+                       on_done=lambda _: QMessageBox.information(self, "Saved", f"Saved to {path}"))
 
     def export_pdf_action(self):
         path, _ = QFileDialog.getSaveFileName(self, "Save PDF", "report.pdf", "PDF Files (*.pdf)")
         if not path: return
         filters = self.get_filters()
-        export_report_pdf(path, filters)
-        QMessageBox.information(self, "Saved", f"Saved to {path}")
+        from app.controllers.report import export_report_pdf
+        self.start_job("Export PDF", export_report_pdf, path, filters,
+                       on_done=lambda _: QMessageBox.information(self, "Saved", f"Saved to {path}"))
+
+    # background jobs
+    def start_job(self, name, func, *args, on_done=None, writes_db=False, job=True, **kwargs):
+        """
+        Run func on a WorkerThread. Progress (rows) and timing go to the status bar,
+        Esc cancels running jobs, DB-writing jobs are queued behind each other.
+        on_done(result) runs on the GUI thread when the job succeeds.
+        job=False: func takes no progress/cancelled hooks
+        """
+        worker = WorkerThread(func, *args, job=job, writes_db=writes_db, **kwargs)
+        worker.job_name = name
+        worker.on_done = on_done
+        worker.progress.connect(self.job_progress)
+        worker.finished.connect(self.job_finished)
+        self.jobs.append(worker)
+        self.statusBar().showMessage(f"{name} started (Esc to cancel)")
+        worker.start()
+        return worker
+
+    def job_progress(self, rows):
+        worker = self.sender()
+        self.statusBar().showMessage(f"{worker.job_name}: {rows} rows (Esc to cancel)")
+
+    def job_finished(self, res):
+        worker = self.sender()
+        if worker in self.jobs:
+            self.jobs.remove(worker)
+        name, secs = worker.job_name, worker.elapsed or 0
+        if isinstance(res, dict) and res.get("cancelled"):
+            self.statusBar().showMessage(f"{name} cancelled after {secs:.1f}s")
+        elif isinstance(res, dict) and "error" in res:
+            self.statusBar().showMessage(f"{name} failed after {secs:.1f}s")
+            QMessageBox.critical(self, name, res["error"])
+        else:
+            self.statusBar().showMessage(f"{name} finished in {secs:.1f}s")
+            if worker.on_done:
+                worker.on_done(res)
+        worker.deleteLater()
+
+    def cancel_jobs(self):
+        for worker in self.jobs:
+            worker.cancel()
+
+    def closeEvent(self, event):
+        # running jobs are cancelled (a write rolls back) and waited for: a QThread
+        # destroyed while it runs aborts the process
+        running = [w for w in self.jobs if w.isRunning()]
+        if running:
+            names = ", ".join(w.job_name for w in running)
+            if QMessageBox.question(self, "Close", f"{names} still running. Cancel and close?",
+                                    QMessageBox.Yes | QMessageBox.No) != QMessageBox.Yes:
+                event.ignore()
+                return
+            self.statusBar().showMessage("Cancelling jobs...")
+            for worker in running:
+                # no result dialogs for a window that is going away
+                worker.finished.disconnect(self.job_finished)
+                worker.cancel()
+            for worker in running:
+                worker.wait()
+        super().closeEvent(event)
 
     def open_register_dialog(self):
-        dlg = RegisterDialog(self)
+        from app.controllers.auth import session_user, authenticate
+        # a recent login / confirmation stands in for the password (no bcrypt)
+        if session_user(self.user.get('token'), roles=('admin',)) is None:
+            password, ok = QInputDialog.getText(self, "Confirm", f"Password for {self.user['username']}:",
+                                                QLineEdit.Password)
+            if not ok:
+                return
+            self.start_job("Confirm", authenticate, self.user['username'], password, job=False,
+                           on_done=self.confirm_done)
+            return
+        dlg = RegisterDialog(self, self.user['token'])
         dlg.exec_()
         # after register, maybe refresh user list (if any UI)
 
-    def load_filters(self):
-        # load aplikasi list
-        conn = get_connection()
-        import pandas as pd
-        df = pd.read_sql_query("SELECT DISTINCT aplikasi FROM aktivitas WHERE aplikasi IS NOT NULL", conn)
-        conn.close()
-        apps = ["All"] + df['aplikasi'].dropna().unique().tolist()
+    def confirm_done(self, user):
+        if not user or user['role'] != 'admin':
+            QMessageBox.warning(self, "Confirm", "Password incorrect")
+            return
+        self.user = user
+        self.open_register_dialog()
+
+    def load_filters(self, apps=None):
+        # load aplikasi list (apps: already fetched list)
+        if apps is None:
+            from app.controllers.aktivitas import list_aplikasi
+            apps = list_aplikasi()
         self.cmbAplikasi.clear()
-        self.cmbAplikasi.addItems(apps)
+        self.cmbAplikasi.addItems(["All"] + apps)
         self.cmbCluster.clear()
         self.cmbCluster.addItems(["All","1","2","3"])
 
@@ -174,31 +387,45 @@ class MainWindow(QMainWindow):
         return filters
 
     def refresh_report_table(self):
-        df = list_activities(self.get_filters())
-        self.model_report.update(df)
+        filters = self.get_filters()
+        if self.actSummary.isChecked():
+            from app.controllers.aktivitas import summarize_activities
+            if self.model_summary is None:
+                from app.utils.pandas_model import PandasModel
+                self.model_summary = PandasModel()
+            self.model_summary.update(summarize_activities(filters))
+            self.tvReport.setModel(self.model_summary)
+            return
+        self.show_report(filters)
+
+    def show_report(self, filters, first=None):
+        """first: (total, first page) already fetched for these filters"""
+        from app.controllers.aktivitas import count_activities, fetch_activities_page
+        self.tvReport.setModel(self.model_report)
+        self.model_report.set_source(
+            partial(count_activities, filters),
+            lambda after, limit: fetch_activities_page(filters, after, limit),
+            lambda columns, row: (row[columns.index('tanggal')], row[columns.index('id')]),
+            first)
+
+    def plot_canvas(self):
+        if self.canvas is None:
+            from app.utils.plot_canvas import MplCanvas
+            self.canvas = MplCanvas(self.plotWidget, width=5, height=4, dpi=100)
+            if self.plotWidget.layout() is None:
+                self.plotWidget.setLayout(QVBoxLayout())
+            self.plotWidget.layout().addWidget(self.canvas)
+        return self.canvas
 
     def plot_clusters(self):
-        df = list_activities(self.get_filters())
-        if df.empty:
-            self.canvas.axes.clear()
-            self.canvas.axes.set_title("No data")
-            self.canvas.draw()
+        from app.controllers.aktivitas import cluster_points
+        pts = cluster_points(self.get_filters())
+        canvas = self.plot_canvas()
+        if pts.empty:
+            canvas.show_message("No data")
             return
-        df2 = df.copy()
-        df2['duration_minutes'] = df2['duration_minutes'].fillna(0)
-        labels = df2['cluster'].fillna(0).astype(int)
-        unique = labels.unique().tolist()
-        mapping = {lab:i for i,lab in enumerate(unique)}
-        colors = labels.map(mapping)
-        self.canvas.axes.clear()
-        self.canvas.axes.scatter(df2['id'], df2['duration_minutes'], c=colors)
-        self.canvas.axes.set_xlabel("ID")
-        self.canvas.axes.set_ylabel("Duration (minutes)")
-        self.canvas.axes.set_title("Clustering Overview")
-        for lab, idx in mapping.items():
-            self.canvas.axes.scatter([], [], label=f"Cluster {lab}")
-        self.canvas.axes.legend()
-        self.canvas.draw()
+        canvas.plot_clusters(pts['id'].to_numpy(), pts['duration_minutes'].to_numpy(),
+                                  pts['cluster'].to_numpy())
 
 def main():
     init_db()
@@ -1,43 +1,437 @@
 # app/models/clustering.py
+import os
+import json
+import sqlite3
+from concurrent.futures import as_completed
+from datetime import datetime
+import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-from .db import get_connection
+from .db import get_connection, transaction, check_cancelled
+from .kmeans1d import kmeans_1d
+from . import summary, colcache
+from app.utils.metrics import timed
+from app.utils.pool import pool_size, spawn_pool
 
-def run_kmeans_and_save():
+# incremental runs fall back to a full refit when new rows sit this many
+# times further (mean squared distance) from their centroid than the rows
+# the stored model was fitted on
+DRIFT_THRESHOLD = 3.0
+MODEL_NAME = "duration"
+# labels per executemany batch in write_clusters (progress/cancel granularity)
+WRITE_BATCH = 50000
+# UPDATE ... FROM needs SQLite 3.33; older ones take the keyed-subquery form
+UPDATE_FROM = sqlite3.sqlite_version_info >= (3, 33, 0)
+
+# grouped mode: columns a run can be partitioned by and the features it can use
+GROUP_COLUMNS = ('aplikasi', 'depo', 'tipe')
+FEATURES = {
+    'duration': "duration_minutes",
+    # minutes from scheduler start to bridge start
+    'lag': "(start_bridge - start_scheduler) / 60.0",
+    # hour of day the scheduler started (the epoch seconds are naive local time)
+    'start_hour': "(start_scheduler % 86400) / 3600.0",
+}
+GROUPED_MODEL_NAME = "grouped"
+# grouped runs below this many active rows fit in-process (pool start-up costs more)
+POOL_MIN_ROWS = 50000
+
+@timed('cluster.write', rows=lambda n: n)
+def write_clusters(conn, ids, clusters, progress=None, cancelled=None):
+    """
+    Bulk write-back of cluster labels: (id, cluster) pairs go into a temp
+    table with executemany and aktivitas is updated with one joined UPDATE,
+    all in a single transaction.
+    progress(rows)/cancelled() are called between WRITE_BATCH sized batches.
+    Returns the number of labels written
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    clusters = np.asarray(clusters, dtype=np.int64)
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS cluster_labels (id INTEGER PRIMARY KEY, cluster INTEGER)")
+    with transaction(conn):
+        conn.execute("DELETE FROM cluster_labels")
+        for start in range(0, len(ids), WRITE_BATCH):
+            check_cancelled(cancelled)
+            end = start + WRITE_BATCH
+            conn.executemany("INSERT INTO cluster_labels (id, cluster) VALUES (?,?)",
+                             zip(ids[start:end].tolist(), clusters[start:end].tolist()))
+            if progress:
+                progress(min(end, len(ids)))
+        check_cancelled(cancelled)
+        summary.mark_query(conn, """
+            SELECT DISTINCT a.tanggal, a.aplikasi FROM cluster_labels l
+            JOIN aktivitas a ON a.id = l.id
+            WHERE a.cluster IS NOT l.cluster
+        """)
+        if UPDATE_FROM:
+            conn.execute("""
+                UPDATE aktivitas SET cluster = l.cluster
+                FROM cluster_labels l
+                WHERE aktivitas.id = l.id AND aktivitas.cluster IS NOT l.cluster
+            """)
+        else:
+            # both subqueries are lookups on the temp table's primary key (no
+            # correlated scan of cluster_labels per aktivitas row)
+            conn.execute("""
+                UPDATE aktivitas SET cluster = (SELECT l.cluster FROM cluster_labels l WHERE l.id = aktivitas.id)
+                WHERE id IN (SELECT id FROM cluster_labels)
+                  AND cluster IS NOT (SELECT l.cluster FROM cluster_labels l WHERE l.id = aktivitas.id)
+            """)
+        conn.execute("DELETE FROM cluster_labels")
+        summary.refresh(conn)
+        colcache.clusters_written(conn, ids, clusters)
+    return len(ids)
+
+def mark_tertunda(conn, where):
+    with transaction(conn):
+        summary.mark_query(conn, f"SELECT DISTINCT tanggal, aplikasi FROM aktivitas WHERE {where}")
+        ids = np.array([r[0] for r in conn.execute(f"SELECT id FROM aktivitas WHERE {where}")], dtype=np.int64)
+        conn.execute(f"UPDATE aktivitas SET cluster = 3 WHERE {where}")
+        summary.refresh(conn)
+        colcache.clusters_written(conn, ids, np.full(len(ids), 3))
+
+def _durations(conn, pending=False):
+    """
+    (ids, durations) of the rows with duration_minutes > 0 (only cluster IS NULL
+    ones when pending), from the column cache when it's on
+    """
+    cols = colcache.load(conn)
+    if cols is None:
+        where = "duration_minutes > 0" + (" AND cluster IS NULL" if pending else "")
+        df = pd.read_sql_query(f"SELECT id, duration_minutes FROM aktivitas WHERE {where}", conn)
+        return df['id'].to_numpy(), df['duration_minutes'].to_numpy(dtype=float)
+    m = cols['duration_minutes'] > 0
+    if pending:
+        m &= cols['cluster'] == 0
+    return cols['id'][m], cols['duration_minutes'][m].astype(float)
+
+def load_model(conn, name=MODEL_NAME):
+    cur = conn.cursor()
+    cur.execute("SELECT params FROM cluster_model WHERE name = ?", (name,))
+    row = cur.fetchone()
+    return json.loads(row["params"]) if row else None
+
+def save_model(conn, model, name=MODEL_NAME):
+    with transaction(conn):
+        conn.execute("INSERT OR REPLACE INTO cluster_model (name, params, n_samples, fitted_at) VALUES (?,?,?,?)",
+                     (name, json.dumps(model), int(sum(model["counts"])), datetime.now().isoformat(timespec='seconds')))
+
+def _replace_model(conn, model, name):
+    # a full fit relabels every row: only its model (global or grouped) stays, so
+    # incremental runs continue the way the current labels were made
+    with transaction(conn):
+        conn.execute("DELETE FROM cluster_model WHERE name IN (?, ?) AND name <> ?",
+                     (MODEL_NAME, GROUPED_MODEL_NAME, name))
+        save_model(conn, model, name)
+
+def fit_kmeans(X, k):
+    """sklearn backend: StandardScaler + KMeans (random init, local optimum); X[:, 0] is the duration"""
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import StandardScaler
+    Xs = StandardScaler().fit_transform(X)
+    kmeans = KMeans(n_clusters=k, random_state=42, n_init="auto")
+    raw = kmeans.fit_predict(Xs)
+    # order clusters by mean duration (smallest -> ringan)
+    means = np.array([X[raw == j, 0].mean() if (raw == j).any() else np.inf for j in range(k)])
+    order = np.argsort(means)
+    rank = np.empty(k, dtype=int)
+    rank[order] = np.arange(k)
+    return rank[raw], means[order]
+
+def fit_exact_1d(X, k):
+    """exact backend: optimal 1-D partition of the durations, deterministic"""
+    return kmeans_1d(X[:, 0], k)
+
+# clustering engines selectable in run_kmeans_and_save; each takes an (n, 1)
+# array and k and returns (labels, centroids) with centroids sorted ascending
+BACKENDS = {
+    "exact1d": fit_exact_1d,
+    "kmeans": fit_kmeans,
+}
+DEFAULT_BACKEND = "exact1d"
+
+@timed('cluster.fit', rows=lambda res: len(res[0]))
+def fit_model(X, backend=DEFAULT_BACKEND):
+    """
+    Full fit on an (n, 1) duration array.
+    Returns (labels, model) where labels index model["centroids"], which are
+    kept sorted ascending so index 0 is always the lightest cluster.
+    The model stores centroids in standardized units (StandardScaler
+    mean/scale) whatever backend produced them.
+    """
+    if backend not in BACKENDS:
+        raise ValueError("Invalid backend")
+    k = 2 if X.shape[0] >= 2 else 1
+    labels, centroids = BACKENDS[backend](X, k)
+    mean = float(X[:, 0].mean())
+    scale = float(X[:, 0].std()) or 1.0
+    centroids = (np.asarray(centroids, dtype=float) - mean) / scale
+    counts = np.bincount(labels, minlength=len(centroids))
+    Xs = (X[:, 0] - mean) / scale
+    inertia = float(((Xs - centroids[labels]) ** 2).mean())
+    model = {
+        "backend": backend,
+        "mean": mean,
+        "scale": scale,
+        "centroids": centroids.tolist(),
+        "counts": counts.tolist(),
+        "inertia": inertia,
+    }
+    return labels, model
+
+@timed('cluster.assign', rows=lambda res: len(res[0]))
+def assign(model, X):
+    """Nearest stored centroid for each row; returns (labels, squared distances)"""
+    Xs = (X[:, 0] - model["mean"]) / model["scale"]
+    c = np.asarray(model["centroids"])
+    d = (Xs[:, None] - c[None, :]) ** 2
+    labels = d.argmin(axis=1)
+    return labels, d[np.arange(len(labels)), labels]
+
+def update_model(model, X, labels):
+    """
+    Mini-batch centroid update: every centroid moves to the running mean of
+    all rows it has absorbed so far (the MiniBatchKMeans update rule, seeded
+    with the stored per-centroid counts so earlier history keeps its weight).
+    """
+    Xs = (X[:, 0] - model["mean"]) / model["scale"]
+    c = np.asarray(model["centroids"], dtype=float)
+    n = np.asarray(model["counts"], dtype=float)
+    m = np.bincount(labels, minlength=len(c)).astype(float)
+    sums = np.bincount(labels, weights=Xs, minlength=len(c))
+    total = n + m
+    c = np.where(total > 0, (c * n + sums) / np.maximum(total, 1), c)
+    order = np.argsort(c)
+    return dict(model, centroids=c[order].tolist(), counts=total[order].astype(int).tolist())
+
+def to_cluster(labels, k):
+    # lightest centroid -> 1 (ringan), heaviest -> 2 (berat)
+    labels = np.asarray(labels)
+    return np.where((labels == k - 1) & (k > 1), 2, 1)
+
+@timed('cluster.run', rows=lambda res: res.get('count_active'))
+def run_kmeans_and_save(mode="incremental", drift_threshold=DRIFT_THRESHOLD, backend=DEFAULT_BACKEND,
+                        progress=None, cancelled=None, group_by=('aplikasi',), features=('duration',),
+                        workers=None):
+    """
+    mode:
+      "full"        refit scaler + KMeans on every row and store the model
+      "incremental" only rows with cluster IS NULL, assigned to the stored centroids
+      "partial_fit" like incremental, then nudge the stored centroids with the new rows
+      "grouped"     refit every group_by partition on its own (see _run_grouped)
+    Incremental modes refit from scratch when there is no stored model yet or
+    when the new rows drift past drift_threshold; after a grouped run they use
+    the group models (see _run_grouped_incremental) until the next full run.
+    backend: key of BACKENDS used for full fits ("exact1d" or "kmeans")
+    group_by / features / workers: grouped mode only; GROUP_COLUMNS, FEATURES keys
+    (duration required), pool processes (default: one per CPU)
+    progress/cancelled: job hooks, see write_clusters
+    """
+    if mode not in ("full", "incremental", "partial_fit", "grouped"):
+        raise ValueError("Invalid mode")
+    if backend not in BACKENDS:
+        raise ValueError("Invalid backend")
     conn = get_connection()
-    df = pd.read_sql_query("SELECT * FROM aktivitas", conn)
-    if df.empty:
+    if mode == "grouped":
+        res = _run_grouped(conn, backend, group_by, features, workers, progress, cancelled)
+        conn.close()
+        return res
+    grouped = None if mode == "full" else load_model(conn, GROUPED_MODEL_NAME)
+    if grouped is not None:
+        res = _run_grouped_incremental(conn, grouped, mode, drift_threshold, progress, cancelled)
+        conn.close()
+        return res
+    model = None if mode == "full" else load_model(conn)
+    if model is None:
+        res = _run_full(conn, backend, progress, cancelled)
         conn.close()
+        return res
+
+    mark_tertunda(conn, "cluster IS NULL AND duration_minutes = 0")
+    ids, durations = _durations(conn, pending=True)
+    if len(ids) == 0:
+        conn.close()
+        return {"status":"up_to_date", "mode":mode}
+    X = durations.reshape(-1, 1)
+    labels, dist = assign(model, X)
+    inertia = model["inertia"]
+    drift = float(dist.mean() / inertia) if inertia > 0 else (0.0 if dist.mean() == 0 else float("inf"))
+    if drift > drift_threshold:
+        res = _run_full(conn, backend, progress, cancelled)
+        conn.close()
+        res["refit"] = "drift"
+        res["drift"] = drift
+        return res
+    k = len(model["centroids"])
+    write_clusters(conn, ids, to_cluster(labels, k), progress, cancelled)
+    if mode == "partial_fit":
+        save_model(conn, update_model(model, X, labels))
+    conn.close()
+    return {"status":"ok", "mode":mode, "count_active": len(ids), "drift": round(drift, 3)}
+
+def _run_full(conn, backend, progress=None, cancelled=None):
+    if conn.execute("SELECT 1 FROM aktivitas LIMIT 1").fetchone() is None:
         return {"status":"empty"}
-    df['duration_minutes'] = df['duration_minutes'].fillna(0).astype(int)
     # mark tertunda = 3
-    cur = conn.cursor()
-    cur.execute("UPDATE aktivitas SET cluster = 3 WHERE duration_minutes = 0")
-    conn.commit()
-    active = df[df['duration_minutes'] > 0].copy()
-    if active.shape[0] == 0:
-        conn.close()
+    mark_tertunda(conn, "duration_minutes = 0 AND cluster IS NOT 3")
+    ids, durations = _durations(conn)
+    if len(ids) == 0:
         return {"status":"only_tertunda"}
-    X = active[['duration_minutes']].values.astype(float)
-    scaler = StandardScaler()
-    Xs = scaler.fit_transform(X)
-    k = 2 if active.shape[0] >= 2 else 1
-    kmeans = KMeans(n_clusters=k, random_state=42, n_init="auto")
-    labels = kmeans.fit_predict(Xs)
-    active['klabel'] = labels
-    means = active.groupby('klabel')['duration_minutes'].mean().sort_values()
-    sorted_labels = list(means.index)
-    mapping = {}
-    if len(sorted_labels) == 1:
-        mapping[sorted_labels[0]] = 1
-    else:
-        mapping[sorted_labels[0]] = 1
-        mapping[sorted_labels[-1]] = 2
+    X = durations.reshape(-1, 1)
+    labels, model = fit_model(X, backend)
     # update DB
-    for _, row in active.iterrows():
-        cluster_value = mapping.get(row['klabel'], 1)
-        cur.execute("UPDATE aktivitas SET cluster = ? WHERE id = ?", (int(cluster_value), int(row['id'])))
-    conn.commit()
-    conn.close()
-    return {"status":"ok", "count_active": active.shape[0]}
+    check_cancelled(cancelled)
+    write_clusters(conn, ids, to_cluster(labels, len(model["centroids"])), progress, cancelled)
+    _replace_model(conn, model, MODEL_NAME)
+    return {"status":"ok", "mode":"full", "count_active": len(ids)}
+
+def _init_group_worker():
+    # sklearn (imported lazily in fit_kmeans) gets one OpenMP thread per
+    # worker process; the pool is what spreads the groups over the cores
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+def _fit_group(key, X, backend):
+    """
+    One partition (runs in a pool worker): (key, clusters 1/2, group model).
+    X[:, 0] is the duration, which orders the clusters (fit_kmeans ranks by it);
+    exact1d only sees that column, so with extra features the group is fitted by KMeans.
+    The model keeps per-feature mean/scale and the standardized member means of the
+    non-empty clusters, lightest first, for _assign_group.
+    """
+    k = 2 if len(X) >= 2 else 1
+    fit = BACKENDS[backend] if X.shape[1] == 1 else fit_kmeans
+    labels, _ = fit(X, k)
+    used, labels = np.unique(labels, return_inverse=True)
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1.0
+    Xs = (X - mean) / scale
+    centroids = np.array([Xs[labels == j].mean(axis=0) for j in range(len(used))])
+    inertia = float(((Xs - centroids[labels]) ** 2).sum(axis=1).mean())
+    model = {"mean": mean.tolist(), "scale": scale.tolist(), "centroids": centroids.tolist(),
+             "counts": np.bincount(labels, minlength=len(used)).tolist(), "inertia": inertia}
+    return key, to_cluster(labels, len(used)), model
+
+def _assign_group(model, X):
+    """Nearest centroid of a group model; returns (clusters 1/2, squared distances)"""
+    Xs = (X - np.asarray(model["mean"])) / np.asarray(model["scale"])
+    c = np.asarray(model["centroids"])
+    d = ((Xs[:, None, :] - c[None, :, :]) ** 2).sum(axis=2)
+    labels = d.argmin(axis=1)
+    return to_cluster(labels, len(c)), d[np.arange(len(labels)), labels]
+
+def _fit_groups(groups, backend, workers=None, cancelled=None):
+    """{key: (clusters, model)} for [(key, X)]; a spawn process pool when it pays off"""
+    rows = sum(len(X) for _, X in groups)
+    workers = pool_size(workers, len(groups))
+    if workers == 1 or rows < POOL_MIN_ROWS:
+        out = {}
+        for key, X in groups:
+            check_cancelled(cancelled)
+            key, clusters, model = _fit_group(key, X, backend)
+            out[key] = (clusters, model)
+        return out
+    pool = spawn_pool(workers, initializer=_init_group_worker)
+    try:
+        # largest groups first, so the longest fit doesn't start last
+        futures = [pool.submit(_fit_group, key, X, backend)
+                   for key, X in sorted(groups, key=lambda g: -len(g[1]))]
+        out = {}
+        for fut in as_completed(futures):
+            check_cancelled(cancelled)
+            key, clusters, model = fut.result()
+            out[key] = (clusters, model)
+        return out
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def _grouped_features(group_by, features):
+    """Validated (group_by, features) lists, duration first"""
+    group_by, features = list(group_by), list(features)
+    if not group_by or set(group_by) - set(GROUP_COLUMNS):
+        raise ValueError("group_by must be a subset of " + ", ".join(GROUP_COLUMNS))
+    if set(features) - set(FEATURES):
+        raise ValueError("features must be a subset of " + ", ".join(FEATURES))
+    # ringan / berat are ranked by duration, so it is always the first column
+    if 'duration' not in features:
+        raise ValueError("features must include duration (clusters are ranked by it)")
+    return group_by, ['duration'] + [f for f in dict.fromkeys(features) if f != 'duration']
+
+def _grouped_parts(conn, group_by, features, pending=False, fills=None):
+    """
+    [(key, ids, X, fill)] per partition of the active rows (only cluster IS NULL
+    ones when pending). Missing lag / start hour (no bridge or scheduler time)
+    become fill: the group's medians, or fills[key] from its stored model.
+    """
+    keys = ", ".join(f"ifnull({c},'') AS {c}" for c in group_by)
+    cols = ", ".join(f"{FEATURES[f]} AS {f}" for f in features)
+    where = "duration_minutes > 0" + (" AND cluster IS NULL" if pending else "")
+    df = pd.read_sql_query(f"SELECT id, {keys}, {cols} FROM aktivitas WHERE {where}", conn)
+    parts = []
+    for key, g in df.groupby(group_by, sort=False):
+        key = "|".join(map(str, key))
+        X = g[features].to_numpy(dtype=float)
+        if fills is not None and key in fills:
+            fill = np.asarray(fills[key], dtype=float)
+        else:
+            fill = np.array([np.median(c[~np.isnan(c)]) if (~np.isnan(c)).any() else 0.0 for c in X.T])
+        X = np.where(np.isnan(X), fill, X)
+        parts.append((key, g['id'].to_numpy(), X, fill))
+    return parts
+
+def _run_grouped(conn, backend, group_by, features, workers=None, progress=None, cancelled=None):
+    """
+    Every (group_by) partition gets its own ringan/berat split on features, so a
+    long-running aplikasi doesn't make everyone else's runs look light.
+    Groups are fitted in parallel (_fit_groups) and all labels are written back in
+    one write_clusters transaction. The group models replace the global one under
+    GROUPED_MODEL_NAME, so incremental runs keep labelling per group.
+    """
+    group_by, features = _grouped_features(group_by, features)
+    if conn.execute("SELECT 1 FROM aktivitas LIMIT 1").fetchone() is None:
+        return {"status":"empty"}
+    mark_tertunda(conn, "duration_minutes = 0 AND cluster IS NOT 3")
+    parts = _grouped_parts(conn, group_by, features)
+    if not parts:
+        return {"status":"only_tertunda"}
+    fitted = _fit_groups([(key, X) for key, _, X, _ in parts], backend, workers, cancelled)
+    check_cancelled(cancelled)
+    ids = np.concatenate([ids for _, ids, _, _ in parts])
+    clusters = np.concatenate([fitted[key][0] for key, _, _, _ in parts])
+    write_clusters(conn, ids, clusters, progress, cancelled)
+    groups = {key: dict(fitted[key][1], fill=fill.tolist()) for key, _, _, fill in parts}
+    _replace_model(conn, {"group_by": group_by, "features": features, "backend": backend,
+                          "counts": np.bincount(clusters, minlength=3)[1:3].tolist(), "groups": groups},
+                   GROUPED_MODEL_NAME)
+    return {"status":"ok", "mode":"grouped", "count_active": len(ids), "groups": len(parts),
+            "group_by": group_by, "features": features}
+
+def _run_grouped_incremental(conn, model, mode, drift_threshold, progress=None, cancelled=None):
+    """
+    Incremental run after a grouped one: new rows are assigned to their group's
+    stored centroids. A group without a model (new aplikasi) or drift past
+    drift_threshold refits every group like the last grouped run did.
+    partial_fit doesn't move group centroids; it behaves like incremental.
+    """
+    group_by, features, groups = model["group_by"], model["features"], model["groups"]
+    mark_tertunda(conn, "cluster IS NULL AND duration_minutes = 0")
+    parts = _grouped_parts(conn, group_by, features, pending=True,
+                           fills={key: g["fill"] for key, g in groups.items()})
+    if not parts:
+        return {"status":"up_to_date", "mode":mode, "grouped": True}
+    refit = "new_group" if any(key not in groups for key, _, _, _ in parts) else None
+    if not refit:
+        assigned = [_assign_group(groups[key], X) for key, _, X, _ in parts]
+        # per-row distance relative to its group's inertia, averaged over the new rows
+        ratios = np.concatenate([dist / groups[key]["inertia"] if groups[key]["inertia"] > 0 else
+                                 np.where(dist == 0, 0.0, np.inf)
+                                 for (key, _, _, _), (_, dist) in zip(parts, assigned)])
+        drift = float(ratios.mean())
+        if drift > drift_threshold:
+            refit = "drift"
+    if refit:
+        res = _run_grouped(conn, model["backend"], group_by, features, progress=progress, cancelled=cancelled)
+        res["refit"] = refit
+        return res
+    ids = np.concatenate([ids for _, ids, _, _ in parts])
+    write_clusters(conn, ids, np.concatenate([c for c, _ in assigned]), progress, cancelled)
+    return {"status":"ok", "mode":mode, "grouped": True, "count_active": len(ids), "drift": round(drift, 3)}
@@ -0,0 +1,283 @@
+# app/models/colcache.py
+# Column cache of aktivitas for analysis: id, tanggal (day number), aplikasi (as
+# dictionary codes), duration_minutes and cluster, stored as raw little-endian
+# arrays next to the DB (<db file>.colcache/) and memory-mapped by readers, so
+# clustering and the cluster plot get their columns without a read_sql_query.
+#
+# Freshness: colcache_state in the DB holds two tokens, rows_gen and cluster_gen.
+# Writers that change existing rows replace one of them inside their own
+# transaction (touch / clusters_written); new rows are picked up by id above the
+# cached watermark (ids are AUTOINCREMENT, never reused). refresh() runs under the
+# DB write lock, so its snapshot is consistent and one process rewrites the files
+# at a time:
+#   same tokens         -> append rows with id > watermark
+#   cluster_gen changed -> re-read the cluster column, then append
+#   rows_gen changed    -> rebuild
+# Code writing aktivitas with its own SQL must call touch() the same way.
+# NULLs: tanggal / aplikasi / duration_minutes -1, cluster 0 (like aktivitas_summary).
+#
+# AKTIVITAS_COLCACHE=0  turns the cache off (readers query SQLite as before)
+import os
+import json
+import logging
+import sqlite3
+import secrets
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+import numpy as np
+from . import db
+from .db import get_connection, transaction
+from app.utils.metrics import timed
+
+log = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("AKTIVITAS_COLCACHE", "1") != "0"
+
+COLUMNS = {'id': '<i8', 'tanggal': '<i4', 'aplikasi': '<i4', 'duration_minutes': '<i4', 'cluster': '<i1'}
+MISSING = -1
+
+# rows per fetchmany when (re)reading aktivitas
+FETCH_ROWS = 100000
+
+_lock = threading.Lock()
+
+class Columns:
+    """Memory-mapped snapshot of the cached columns (read-only arrays) + the aplikasi dictionary"""
+    def __init__(self, arrays, names):
+        self.arrays = arrays
+        self.names = names
+        self._codes = {name: i for i, name in enumerate(names)}
+
+    def __len__(self):
+        return len(self.arrays['id'])
+
+    def __getitem__(self, column):
+        return self.arrays[column]
+
+    def mask(self, filters=None):
+        """Boolean mask of the rows matching a list_activities filters dict"""
+        from app.models.timestamps import to_day
+        m = np.ones(len(self), dtype=bool)
+        if not filters:
+            return m
+        tanggal = self.arrays['tanggal']
+        if filters.get('date_from'):
+            m &= (tanggal >= to_day(filters['date_from'])) & (tanggal != MISSING)
+        if filters.get('date_to'):
+            m &= (tanggal <= to_day(filters['date_to'])) & (tanggal != MISSING)
+        if filters.get('aplikasi'):
+            m &= self.arrays['aplikasi'] == self._codes.get(filters['aplikasi'], -2)
+        if filters.get('cluster'):
+            m &= self.arrays['cluster'] == int(filters['cluster'])
+        return m
+
+def cache_dir():
+    path = Path(db.DB_PATH)
+    return path.with_name(path.name + ".colcache")
+
+def _file(d, column, build):
+    return d / f"{column}.{build}.bin"
+
+def _read_meta(d):
+    try:
+        return json.loads((d / "meta.json").read_text())
+    except (OSError, ValueError):
+        return None
+
+def _write_meta(d, meta):
+    tmp = d / "meta.json.tmp"
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, d / "meta.json")
+
+def _state(conn):
+    return conn.execute("SELECT key, rows_gen, cluster_gen FROM colcache_state").fetchone()
+
+def _top(conn):
+    return conn.execute("SELECT ifnull(max(id),0) FROM aktivitas").fetchone()[0]
+
+def _same_rows(meta, state, top):
+    # cached rows are still valid (possibly with rows missing above the watermark)
+    return (meta is not None and meta['key'] == state['key'] and meta['rows_gen'] == state['rows_gen']
+            and top >= meta['watermark'])
+
+def touch(conn, what="rows_gen"):
+    """
+    Inside a writer's transaction: existing rows changed (rows_gen) or only their
+    cluster (cluster_gen); the next refresh re-reads instead of appending.
+    Returns the new token
+    """
+    token = secrets.randbits(62)
+    conn.execute(f"UPDATE colcache_state SET {what} = ?", (token,))
+    return token
+
+def _fetch(conn, where="", params=()):
+    # integer columns with the NULL sentinels + aplikasi text, in id order
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.execute(f"""SELECT id, ifnull(tanggal,{MISSING}), ifnull(duration_minutes,{MISSING}), ifnull(cluster,0), aplikasi
+                    FROM aktivitas {where} ORDER BY id""", params)
+    while True:
+        rows = cur.fetchmany(FETCH_ROWS)
+        if not rows:
+            return
+        ints = np.array([r[:4] for r in rows], dtype=np.int64).reshape(-1, 4)
+        yield ints, [r[4] for r in rows]
+
+def _encode(apps, names):
+    # aplikasi text -> codes into names (extended with new values in place)
+    import pandas as pd
+    codes, uniques = pd.factorize(pd.Series(apps, dtype=object))
+    index = {name: i for i, name in enumerate(names)}
+    for u in uniques:
+        if u not in index:
+            index[u] = len(names)
+            names.append(u)
+    mapping = np.array([index[u] for u in uniques] + [MISSING], dtype=np.int32)
+    return mapping[codes]  # factorize gives -1 for None, i.e. the last mapping entry
+
+def _append(d, meta, conn, where="WHERE id > ?", params=None):
+    # rows above the watermark go to the end of each column file
+    params = (meta['watermark'],) if params is None else params
+    paths = {c: _file(d, c, meta['build']) for c in COLUMNS}
+    files = {c: open(p, "r+b" if p.exists() else "w+b") for c, p in paths.items()}
+    added = 0
+    try:
+        for f, dtype in zip(files.values(), COLUMNS.values()):
+            # drop a tail left by an append that didn't get to write its meta
+            f.truncate(meta['rows'] * np.dtype(dtype).itemsize)
+            f.seek(0, os.SEEK_END)
+        for ints, apps in _fetch(conn, where, params):
+            chunk = {'id': ints[:, 0], 'tanggal': ints[:, 1], 'duration_minutes': ints[:, 2],
+                     'cluster': ints[:, 3], 'aplikasi': _encode(apps, meta['names'])}
+            for c, dtype in COLUMNS.items():
+                files[c].write(chunk[c].astype(dtype).tobytes())
+            added += len(ints)
+            meta['watermark'] = int(ints[-1, 0])
+    finally:
+        for f in files.values():
+            f.close()
+    meta['rows'] += added
+    return added
+
+def _rebuild(d, conn, state):
+    old = _read_meta(d)
+    meta = {'key': state['key'], 'rows_gen': state['rows_gen'], 'cluster_gen': state['cluster_gen'],
+            'build': (old['build'] + 1) if old else 1, 'watermark': 0, 'rows': 0, 'names': []}
+    _append(d, meta, conn, "", ())
+    _write_meta(d, meta)
+    if old:
+        for c in COLUMNS:
+            try:
+                _file(d, c, old['build']).unlink()
+            except OSError:
+                pass  # still mapped (Windows); overwritten names never repeat
+    return meta
+
+def _reload_clusters(d, meta, conn):
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.execute("SELECT ifnull(cluster,0) FROM aktivitas WHERE id <= ? ORDER BY id", (meta['watermark'],))
+    values = np.fromiter((r[0] for r in cur), dtype=COLUMNS['cluster'])
+    if len(values) != meta['rows']:
+        return False
+    if len(values):
+        out = np.memmap(_file(d, 'cluster', meta['build']), dtype=COLUMNS['cluster'], mode="r+", shape=(meta['rows'],))
+        out[:] = values
+        out.flush()
+    return True
+
+@contextmanager
+def _write_lock(conn, wait):
+    # DB write lock first, like the writers calling clusters_written; without wait
+    # a writer holding it raises OperationalError at once instead of after BUSY_TIMEOUT
+    if not wait:
+        conn.execute("PRAGMA busy_timeout = 0")
+    try:
+        with transaction(conn), _lock:
+            yield
+    finally:
+        if not wait:
+            conn.execute(f"PRAGMA busy_timeout = {int(db.BUSY_TIMEOUT * 1000)}")
+
+@timed('colcache.refresh')
+def refresh(conn=None, wait=True):
+    """
+    Bring the cache in step with aktivitas; returns its meta.
+    wait=False: raise sqlite3.OperationalError right away when a writer holds the DB
+    """
+    conn = conn or get_connection()
+    d = cache_dir()
+    d.mkdir(exist_ok=True)
+    meta, state, top = _read_meta(d), _state(conn), _top(conn)
+    # up to date: no write lock, so readers don't queue behind a running import
+    if _same_rows(meta, state, top) and meta['cluster_gen'] == state['cluster_gen'] and top == meta['watermark']:
+        return meta
+    with _write_lock(conn, wait):
+        meta, state, top = _read_meta(d), _state(conn), _top(conn)
+        if not _same_rows(meta, state, top):
+            return _rebuild(d, conn, state)
+        if meta['cluster_gen'] != state['cluster_gen']:
+            if not _reload_clusters(d, meta, conn):
+                return _rebuild(d, conn, state)
+            meta['cluster_gen'] = state['cluster_gen']
+        if top > meta['watermark']:
+            _append(d, meta, conn)
+        _write_meta(d, meta)
+        return meta
+
+def load(conn=None, wait=True):
+    """
+    Columns snapshot after a refresh, or None when the cache is off or can't be
+    refreshed right now (DB locked by a writer, cache dir not writable): callers
+    then query SQLite.
+    wait=False (GUI-thread readers): a stale cache under a running writer gives
+    None at once instead of waiting for the write lock
+    """
+    if not ENABLED:
+        return None
+    try:
+        meta = refresh(conn, wait)
+    except (sqlite3.OperationalError, OSError) as e:
+        log.info("column cache not used: %s", e)
+        return None
+    d = cache_dir()
+    arrays = {}
+    for c, dtype in COLUMNS.items():
+        if meta['rows']:
+            arrays[c] = np.memmap(_file(d, c, meta['build']), dtype=dtype, mode="r", shape=(meta['rows'],))
+        else:
+            arrays[c] = np.empty(0, dtype=dtype)
+    return Columns(arrays, meta['names'])
+
+def clusters_written(conn, ids, clusters):
+    """
+    Inside write_clusters / mark_tertunda after their UPDATE: replaces cluster_gen and,
+    when the cache was current, writes the labels into it in place (no re-read).
+    """
+    old = _state(conn)['cluster_gen']
+    token = touch(conn, "cluster_gen")
+    if not ENABLED:
+        return
+    d = cache_dir()
+    with _lock:
+        meta = _read_meta(d)
+        state = _state(conn)
+        if not (_same_rows(meta, state, _top(conn)) and meta['cluster_gen'] == old and meta['rows']):
+            return
+        ids = np.asarray(ids, dtype=np.int64)
+        # rows above the watermark aren't cached yet; they come with their labels on append
+        keep = ids <= meta['watermark']
+        try:
+            cached = np.memmap(_file(d, 'id', meta['build']), dtype=COLUMNS['id'], mode="r", shape=(meta['rows'],))
+            pos = np.searchsorted(cached, ids[keep])
+            if (pos >= len(cached)).any() or (cached[np.minimum(pos, len(cached) - 1)] != ids[keep]).any():
+                return
+            out = np.memmap(_file(d, 'cluster', meta['build']), dtype=COLUMNS['cluster'], mode="r+", shape=(meta['rows'],))
+            out[pos] = np.asarray(clusters)[keep]
+            out.flush()
+            meta['cluster_gen'] = token
+            _write_meta(d, meta)
+        except OSError as e:
+            # left stale: the next refresh re-reads the cluster column
+            log.info("column cache not patched: %s", e)
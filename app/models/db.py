@@ -1,22 +1,288 @@
 # app/models/db.py
 import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-import shutil
+from .timestamps import DAY_COLUMNS, EPOCH_COLUMNS, TEXT_FORMS
 
 BASE = Path(__file__).resolve().parents[2] / "app"
 DATA_DIR = BASE / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 DB_PATH = DATA_DIR / "aktivitas.db"
 
+log = logging.getLogger(__name__)
+
+# applied once per pooled connection; WAL lets readers (GUI refresh) run
+# while a worker thread imports or writes cluster labels
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",       # 64 MB page cache
+    "PRAGMA mmap_size=268435456",     # 256 MB memory-mapped reads
+    "PRAGMA temp_store=MEMORY",
+)
+BUSY_TIMEOUT = 30  # seconds to wait on a locked database before failing
+
+_pool = threading.local()
+
+class Cancelled(Exception):
+    """Raised by long jobs when their cancel hook fires (open transaction is rolled back)"""
+
+def check_cancelled(cancelled):
+    if cancelled is not None and cancelled():
+        raise Cancelled()
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Connection kept open for reuse by its thread.
+    close() only releases it: pending changes outside a transaction() block
+    are rolled back, like a real close would. close_connection() really
+    closes it.
+    """
+    managed = 0
+
+    def close(self):
+        if self.in_transaction and not self.managed:
+            self.rollback()
+
+    def really_close(self):
+        super().close()
+
 def get_connection():
-    conn = sqlite3.connect(str(DB_PATH), detect_types=sqlite3.PARSE_DECLTYPES|sqlite3.PARSE_COLNAMES)
-    conn.row_factory = sqlite3.Row
+    """Per-thread pooled connection to DB_PATH (no decltype parsing)"""
+    conns = getattr(_pool, "conns", None)
+    if conns is None:
+        conns = _pool.conns = {}
+    path = str(DB_PATH)
+    conn = conns.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, factory=PooledConnection)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conns[path] = conn
     return conn
 
+def close_connection():
+    """Close this thread's pooled connections (e.g. when a worker finishes)"""
+    for conn in getattr(_pool, "conns", {}).values():
+        conn.really_close()
+    _pool.conns = {}
+
+@contextmanager
+def transaction(conn=None):
+    """
+    with transaction() as conn: ...
+    Takes the write lock up front (BEGIN IMMEDIATE), commits on success and
+    rolls back on error. Nested use joins the outer transaction.
+    """
+    conn = conn or get_connection()
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    conn.managed += 1
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.managed -= 1
+
+# identity of one activity row; re-imports of the same row update it in place.
+# A missing start time is folded to '' so a row with only one of them still matches.
+NATURAL_KEY = ("ifnull(tanggal,'')", "ifnull(aplikasi,'')",
+               "ifnull(start_scheduler,'')", "ifnull(start_bridge,'')")
+# rows without any start time (pending runs) have no identity: they're outside the
+# unique index and always inserted, never merged into each other
+NATURAL_KEY_WHERE = "start_scheduler IS NOT NULL OR start_bridge IS NOT NULL"
+
+def _create_natural_key(conn):
+    conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS uq_aktivitas_natural_key "
+                 f"ON aktivitas({', '.join(NATURAL_KEY)}) WHERE {NATURAL_KEY_WHERE}")
+
+def _m001_natural_key(conn):
+    # copies left by earlier append-only imports can't stay next to the unique
+    # index: the later ones are moved to aktivitas_duplicates (kept for review)
+    dup = f"""({NATURAL_KEY_WHERE}) AND id NOT IN (
+        SELECT MIN(id) FROM aktivitas WHERE {NATURAL_KEY_WHERE} GROUP BY {", ".join(NATURAL_KEY)})"""
+    n = conn.execute(f"SELECT COUNT(*) FROM aktivitas WHERE {dup}").fetchone()[0]
+    if n:
+        conn.execute("CREATE TABLE IF NOT EXISTS aktivitas_duplicates AS SELECT * FROM aktivitas WHERE 0")
+        conn.execute(f"INSERT INTO aktivitas_duplicates SELECT * FROM aktivitas WHERE {dup}")
+        conn.execute(f"DELETE FROM aktivitas WHERE {dup}")
+        log.warning("%d aktivitas rows repeat the natural key of an earlier row; "
+                    "moved to table aktivitas_duplicates", n)
+    _create_natural_key(conn)
+
+def _m002_fill_summary(conn):
+    from .summary import rebuild
+    rebuild(conn)
+
+def _m003_query_indexes(conn):
+    # shapes of list_activities / count_activities: optional tanggal range,
+    # aplikasi and cluster equality, ORDER BY tanggal DESC, id DESC.
+    # The rowid is the implicit last key, so each index also serves the ORDER BY.
+    conn.execute("DROP INDEX IF EXISTS idx_aktivitas_cluster")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_aktivitas_cluster_tanggal ON aktivitas(cluster, tanggal)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_aktivitas_aplikasi_tanggal ON aktivitas(aplikasi, tanggal)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_aktivitas_aplikasi_cluster_tanggal ON aktivitas(aplikasi, cluster, tanggal)")
+    conn.execute("INSERT OR IGNORE INTO aplikasi_lookup SELECT DISTINCT aplikasi FROM aktivitas_summary WHERE aplikasi <> ''")
+    conn.execute("ANALYZE")
+
+AKTIVITAS_COLUMNS = ('id', 'tanggal', 'aplikasi', 'depo', 'tipe', 'collection', 'object',
+                     'start_scheduler', 'finish_scheduler', 'start_bridge', 'finish_bridge',
+                     'duration_minutes', 'status', 'notes', 'scheduled_at', 'cluster')
+
+def _m004_typed_timestamps(conn):
+    # tanggal -> INTEGER day number, scheduler/bridge times -> INTEGER epoch
+    # seconds (see models/timestamps.py); SQLite can't change a column type,
+    # so the table is rebuilt and its indexes recreated
+    conn.execute("DROP VIEW IF EXISTS aktivitas_text")
+    conn.execute("""
+    CREATE TABLE aktivitas_typed (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tanggal INTEGER,
+        aplikasi TEXT,
+        depo TEXT,
+        tipe TEXT,
+        collection TEXT,
+        object TEXT,
+        start_scheduler INTEGER,
+        finish_scheduler INTEGER,
+        start_bridge INTEGER,
+        finish_bridge INTEGER,
+        duration_minutes INTEGER,
+        status TEXT,
+        notes TEXT,
+        scheduled_at TEXT,
+        cluster INTEGER
+    )
+    """)
+    convert = {c: f"CAST(strftime('%s', {c}) AS INTEGER) / 86400" for c in DAY_COLUMNS}
+    convert.update({c: f"CAST(strftime('%s', {c}) AS INTEGER)" for c in EPOCH_COLUMNS})
+    conn.execute(f"""
+        INSERT INTO aktivitas_typed ({", ".join(AKTIVITAS_COLUMNS)})
+        SELECT {", ".join(convert.get(c, c) for c in AKTIVITAS_COLUMNS)} FROM aktivitas
+    """)
+    conn.execute("DROP TABLE aktivitas")
+    conn.execute("ALTER TABLE aktivitas_typed RENAME TO aktivitas")
+    conn.execute("CREATE INDEX idx_aktivitas_tanggal ON aktivitas(tanggal)")
+    conn.execute("CREATE INDEX idx_aktivitas_cluster_tanggal ON aktivitas(cluster, tanggal)")
+    conn.execute("CREATE INDEX idx_aktivitas_aplikasi_tanggal ON aktivitas(aplikasi, tanggal)")
+    conn.execute("CREATE INDEX idx_aktivitas_aplikasi_cluster_tanggal ON aktivitas(aplikasi, cluster, tanggal)")
+    _create_natural_key(conn)
+    # the old text forms, for ad-hoc SQL and external tools
+    conn.execute(f"""
+        CREATE VIEW aktivitas_text AS
+        SELECT {", ".join(f"{TEXT_FORMS[c]} AS {c}" if c in TEXT_FORMS else c for c in AKTIVITAS_COLUMNS)}
+        FROM aktivitas
+    """)
+    # summary groups by day number too; -1 stands for a NULL tanggal
+    conn.execute("DROP TABLE aktivitas_summary")
+    conn.execute("""
+    CREATE TABLE aktivitas_summary (
+        tanggal INTEGER NOT NULL,
+        aplikasi TEXT NOT NULL,
+        cluster INTEGER NOT NULL,
+        n INTEGER,
+        total_duration INTEGER,
+        min_duration INTEGER,
+        max_duration INTEGER,
+        PRIMARY KEY (tanggal, aplikasi, cluster)
+    )
+    """)
+    from .summary import rebuild
+    rebuild(conn)
+    conn.execute("ANALYZE")
+
+def _m005_import_templates(conn):
+    # compiled column mapping / formats per export layout (see models/templates.py)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS import_templates (
+        signature TEXT PRIMARY KEY,
+        header TEXT,
+        plan TEXT,
+        created_at TEXT
+    )
+    """)
+
+def _m006_metrics(conn):
+    # operation timings written by app/utils/metrics.py
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        op TEXT NOT NULL,
+        finished_at TEXT,
+        seconds REAL,
+        rows INTEGER,
+        peak_rss_mb REAL,
+        failed INTEGER DEFAULT 0,
+        thread TEXT
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_metrics_op ON metrics(op)")
+
+def _m007_colcache_state(conn):
+    # freshness tokens of the column cache (see models/colcache.py): writers replace
+    # rows_gen / cluster_gen when they change existing rows, key ties a cache to this DB
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS colcache_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        key TEXT NOT NULL,
+        rows_gen INTEGER NOT NULL,
+        cluster_gen INTEGER NOT NULL
+    )
+    """)
+    conn.execute("INSERT OR IGNORE INTO colcache_state (id, key, rows_gen, cluster_gen) "
+                 "VALUES (1, lower(hex(randomblob(16))), 0, 0)")
+
+def _m008_partial_natural_key(conn):
+    # the key used to cover rows without start times too, merging distinct pending
+    # runs of one day and aplikasi; it now leaves them out (NATURAL_KEY_WHERE)
+    conn.execute("DROP INDEX IF EXISTS uq_aktivitas_natural_key")
+    _create_natural_key(conn)
+
+def _m009_metrics_rss(conn):
+    # metrics recorded ru_maxrss (peak over the process lifetime) as peak_rss_mb;
+    # now the RSS at the end of each operation and its change over the operation.
+    # The old column stays for existing rows, nothing writes it any more
+    conn.execute("ALTER TABLE metrics ADD COLUMN rss_mb REAL")
+    conn.execute("ALTER TABLE metrics ADD COLUMN rss_delta_mb REAL")
+
+# schema migrations, applied in order; PRAGMA user_version holds the last one applied
+MIGRATIONS = [
+    (1, _m001_natural_key),
+    (2, _m002_fill_summary),
+    (3, _m003_query_indexes),
+    (4, _m004_typed_timestamps),
+    (5, _m005_import_templates),
+    (6, _m006_metrics),
+    (7, _m007_colcache_state),
+    (8, _m008_partial_natural_key),
+    (9, _m009_metrics_rss),
+]
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """Apply pending MIGRATIONS, each in its own transaction"""
+    for version, step in MIGRATIONS:
+        if version <= schema_version(conn):
+            continue
+        with transaction(conn):
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+
 def init_db():
     conn = get_connection()
     cur = conn.cursor()
+    # version 0 schema; later changes are in MIGRATIONS
     # users
     cur.execute("""
     CREATE TABLE IF NOT EXISTS users (
@@ -50,25 +316,65 @@ def init_db():
         cluster INTEGER
     )
     """)
+    # files already imported, keyed on content hash + date filter
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS import_files (
+        file_hash TEXT,
+        date_filter TEXT,
+        path TEXT,
+        rows INTEGER,
+        imported_at TEXT,
+        PRIMARY KEY (file_hash, date_filter)
+    )
+    """)
+    # fitted clustering state (scaler + centroids as json) for incremental runs
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS cluster_model (
+        name TEXT PRIMARY KEY,
+        params TEXT,
+        n_samples INTEGER,
+        fitted_at TEXT
+    )
+    """)
+    # per day / aplikasi / cluster counts and duration stats (see models/summary.py)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS aktivitas_summary (
+        tanggal TEXT NOT NULL,
+        aplikasi TEXT NOT NULL,
+        cluster INTEGER NOT NULL,
+        n INTEGER,
+        total_duration INTEGER,
+        min_duration INTEGER,
+        max_duration INTEGER,
+        PRIMARY KEY (tanggal, aplikasi, cluster)
+    )
+    """)
+    # distinct aplikasi values for the filter combo, kept by summary.refresh
+    cur.execute("CREATE TABLE IF NOT EXISTS aplikasi_lookup (aplikasi TEXT PRIMARY KEY)")
     # Indexes for performance
     cur.execute("CREATE INDEX IF NOT EXISTS idx_aktivitas_tanggal ON aktivitas(tanggal)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_aktivitas_cluster ON aktivitas(cluster)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)")
     conn.commit()
+    migrate(conn)
     # insert default admin if none
     cur.execute("SELECT COUNT(*) as c FROM users")
     if cur.fetchone()["c"] == 0:
-        # default admin: username admin, password admin123 (hashed later by auth module if needed)
+        # default admin: username admin, password admin123; stored as given and replaced
+        # by a bcrypt hash on the first login (auth.authenticate), so db stays free of bcrypt
         cur.execute("INSERT INTO users (nip,nama,email,username,password,role) VALUES (?,?,?,?,?,?)",
                     ("000000", "Administrator", "admin@example.com", "admin", "admin123", "admin"))
         conn.commit()
     conn.close()
 
 def backup_db():
-    """Simple DB backup: copy with timestamp"""
+    """Simple DB backup: copy with timestamp (sqlite backup API, includes the WAL)"""
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     backup_path = DATA_DIR / f"aktivitas_backup_{ts}.db"
-    shutil.copy2(DB_PATH, backup_path)
+    dst = sqlite3.connect(str(backup_path))
+    try:
+        get_connection().backup(dst)
+    finally:
+        dst.close()
     return str(backup_path)
 
 if __name__ == "__main__":
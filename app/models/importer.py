@@ -1,10 +1,65 @@
 # app/models/importer.py
 import pandas as pd
 import re
+import os
+import glob
+import hashlib
+import logging
+from time import perf_counter
+from concurrent.futures import wait, FIRST_COMPLETED
+from pathlib import Path
 from datetime import datetime, timedelta, time
-from .db import get_connection
+from .db import get_connection, transaction, check_cancelled, NATURAL_KEY, NATURAL_KEY_WHERE
+from . import summary, templates, colcache
+from .timestamps import day_column, epoch_column
+from app.utils.metrics import timed, record
+from app.utils.pool import pool_size, spawn_pool
 import numpy as np
 
+log = logging.getLogger(__name__)
+
+# pandas >= 2 infers one format for a whole column unless told otherwise;
+# "mixed" keeps the old per-value parsing behaviour
+_DATE_KW = {"format": "mixed"} if int(pd.__version__.split('.')[0]) >= 2 else {}
+
+# column aliases used in the scheduler exports
+COLUMN_ALIASES = {
+    'tanggal': ['tanggal','date'],
+    'aplikasi': ['aplikasi','app','application'],
+    'start_scheduler': ['start scheduler','start_scheduler'],
+    'finish_scheduler': ['scheduller finish','finish scheduler','finish_scheduler'],
+    'start_bridge': ['start bridge','start_bridge','start birdge'],
+    'finish_bridge': ['finish bridge','finish_bridge'],
+    'status': ['status'],
+    'notes': ['notes','keterangan','note'],
+}
+
+# rows per read/parse/insert batch when importing
+CHUNK_ROWS = 50000
+
+TIME_COLUMNS = ['start_scheduler','finish_scheduler','start_bridge','finish_bridge']
+
+INSERT_SQL = """
+    INSERT INTO aktivitas (
+        tanggal, aplikasi, start_scheduler, finish_scheduler,
+        start_bridge, finish_bridge, duration_minutes, status, notes
+    ) VALUES (?,?,?,?,?,?,?,?,?)
+"""
+# re-imported rows refresh the finish times/status; the cluster is
+# dropped when the duration changed so the next clustering run re-assigns it
+UPSERT_SQL = INSERT_SQL + f"""
+    ON CONFLICT({", ".join(NATURAL_KEY)}) WHERE {NATURAL_KEY_WHERE} DO UPDATE SET
+        finish_scheduler = excluded.finish_scheduler,
+        finish_bridge = excluded.finish_bridge,
+        status = excluded.status,
+        notes = excluded.notes,
+        cluster = CASE WHEN aktivitas.duration_minutes IS excluded.duration_minutes
+                       THEN aktivitas.cluster ELSE NULL END,
+        duration_minutes = excluded.duration_minutes
+"""
+INSERT_COLUMNS = ['tanggal','aplikasi','start_scheduler','finish_scheduler',
+                  'start_bridge','finish_bridge','duration_minutes','status','notes']
+
 def parse_time_value(val, ref_date=None):
     if pd.isna(val):
         return None
@@ -42,98 +97,520 @@ def adjust_finish(start_dt, finish_dt):
         return finish_dt + timedelta(days=1)
     return finish_dt
 
+# cell formats parse_time_column understands, in the order it tries them
+TIME_KINDS = ('datetime', 'duration', 'clock', 'fraction')
+
+def _duration_cells(s, ref):
+    # "X jam Y menit Z detik"
+    hit = s.str.contains('jam', regex=False) | s.str.contains('menit', regex=False)
+    d = s[hit]
+    h = pd.to_numeric(d.str.extract(r'(\d+)\s*jam', expand=False), errors='coerce').fillna(0)
+    m = pd.to_numeric(d.str.extract(r'(\d+)\s*menit', expand=False), errors='coerce').fillna(0)
+    sec = pd.to_numeric(d.str.extract(r'(\d+)\s*detik', expand=False), errors='coerce').fillna(0)
+    return hit, ref[hit] + pd.to_timedelta(h * 3600 + m * 60 + sec, unit='s')
+
+def _clock_cells(s, ref):
+    # HH:MM:SS, HH:MM, HH (with '.' or ',' as separator)
+    hms = s.str.replace('.', ':', regex=False).str.replace(',', ':', regex=False) \
+           .str.extract(r'^(\d{1,2})(?::(\d{1,2}))?(?::(\d{1,2}))?$')
+    h = pd.to_numeric(hms[0], errors='coerce')
+    m = pd.to_numeric(hms[1], errors='coerce').fillna(0)
+    sec = pd.to_numeric(hms[2], errors='coerce').fillna(0)
+    hit = h.notna() & (h <= 23) & (m <= 59) & (sec <= 59)
+    return hit, ref[hit] + pd.to_timedelta(h[hit] * 3600 + m[hit] * 60 + sec[hit], unit='s')
+
+# fixed-width clock layouts a template can ask for instead of the regex
+CLOCK_LAYOUTS = ('hh:mm:ss', 'hh:mm')
+
+def _layout_cells(s, ref, layout):
+    # character codes in a (rows, width + 1) array; digits and ':' checked
+    # per position, so no per-cell regex
+    width = len(layout)
+    codes = s.to_numpy(dtype=f'<U{width + 1}').view(np.uint32).reshape(len(s), width + 1)
+    digit = np.array([ch != ':' for ch in layout])
+    ok = (codes[:, width] == 0) & (codes[:, width - 1] != 0)
+    ok &= ((codes[:, :width][:, digit] >= 48) & (codes[:, :width][:, digit] <= 57)).all(axis=1)
+    ok &= (codes[:, :width][:, ~digit] == 58).all(axis=1)
+    d = codes.astype(np.int64) - 48
+    h = d[:, 0] * 10 + d[:, 1]
+    m = d[:, 3] * 10 + d[:, 4]
+    sec = d[:, 6] * 10 + d[:, 7] if width == 8 else 0
+    ok &= (h <= 23) & (m <= 59) & (sec <= 59)
+    hit = pd.Series(ok, index=s.index)
+    secs = (h * 3600 + m * 60 + sec)[ok]
+    return hit, ref[hit] + pd.to_timedelta(secs, unit='s')
+
+def _float(v):
+    try:
+        return float(v)
+    except ValueError:
+        return np.nan
+
+def _fraction_cells(s, ref, raw=None):
+    # Excel time fraction (0 < x < 1 of a day), read from the raw cells: numbers
+    # as stored, text through float() like parse_time_value. Neither the str()
+    # form nor pd.to_numeric's string parser round-trips exactly, which puts
+    # cells just below a second boundary
+    raw = s if raw is None else raw[s.index]
+    text = raw.map(lambda v: isinstance(v, str))
+    num = pd.to_numeric(raw.where(~text), errors='coerce').astype(float)
+    if text.any():
+        num[text] = raw[text].str.strip().map(_float)
+    hit = (num > 0) & (num < 1)
+    return hit, ref[hit] + pd.to_timedelta(np.floor(num[hit] * 24 * 3600), unit='s')
+
+_TEXT_PARSERS = {
+    'duration': _duration_cells,
+    'hh:mm:ss': lambda s, ref: _layout_cells(s, ref, 'hh:mm:ss'),
+    'hh:mm': lambda s, ref: _layout_cells(s, ref, 'hh:mm'),
+    'clock': _clock_cells,
+    'fraction': _fraction_cells,
+}
+
+def parse_time_column(values, ref_dates, kinds=TIME_KINDS, claimed=None):
+    """
+    Column-wise version of parse_time_value.
+    values: Series of raw cells, ref_dates: datetime64 Series (midnight) aligned with values
+    kinds: formats to try (a template's detected formats, TIME_KINDS or
+    CLOCK_LAYOUTS); cells none of them parse are retried with all of
+    TIME_KINDS, so the result doesn't depend on it
+    claimed: optional dict, filled with the number of cells each kind parsed
+    Returns a datetime64 Series (NaT where the cell can't be parsed)
+    """
+    out = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('datetime64[ns]')
+    present = values.notna()
+    if not present.any():
+        return out
+    full = all(k in kinds for k in TIME_KINDS)
+    if 'fraction' in kinds:
+        # '0.5' reads as 00:05 in the full order, so fractions keep the clock check ahead of them
+        kinds = set(kinds) | {'clock'}
+    rest = present
+    # cells that already hold a datetime are kept as they are
+    if 'datetime' in kinds:
+        is_dt = present & values.map(lambda v: isinstance(v, datetime))
+        if is_dt.any():
+            out[is_dt] = pd.to_datetime(values[is_dt])
+        if claimed is not None:
+            claimed['datetime'] = int(is_dt.sum())
+        rest = present & ~is_dt
+    s = values[rest].astype(str).str.strip()
+    ref = ref_dates[rest]
+    for kind in _TEXT_PARSERS:
+        if kind not in kinds or s.empty:
+            continue
+        if kind == 'fraction':
+            hit, parsed = _fraction_cells(s, ref, values)
+        else:
+            hit, parsed = _TEXT_PARSERS[kind](s, ref)
+        if hit.any():
+            out[parsed.index] = parsed
+        if claimed is not None:
+            claimed[kind] = int(hit.sum())
+        s = s[~hit]
+        ref = ref[~hit]
+    if not full and not s.empty:
+        out[s.index] = parse_time_column(values[s.index], ref_dates[s.index])
+    return out
+
+def clock_layout(values):
+    """The CLOCK_LAYOUTS entry matching every clock cell of values, or None"""
+    text = values.notna() & ~values.map(lambda v: isinstance(v, datetime))
+    if not text.any():
+        return None
+    s = values[text].astype(str).str.strip()
+    ref = pd.Series(pd.Timestamp(0), index=s.index)
+    n = int(_clock_cells(s, ref)[0].sum())
+    for layout in CLOCK_LAYOUTS:
+        if n and int(_layout_cells(s, ref, layout)[0].sum()) == n:
+            return layout
+    return None
+
+def adjust_finish_column(start, finish):
+    # finish earlier than start means the run went past midnight
+    return finish.mask(finish < start, finish + pd.Timedelta(days=1))
+
+def _object_column(series):
+    # plain python values for sqlite, NaN/NaT -> None
+    return series.astype(object).where(series.notna(), None)
+
+def resolve_columns(columns):
+    # lower-case mapping keys
+    cols_map = {str(c).lower().strip(): c for c in columns}
+    resolved = {}
+    for key, names in COLUMN_ALIASES.items():
+        resolved[key] = next((cols_map[n] for n in names if n in cols_map), None)
+    return resolved
+
+def prepare_frame(df, cols, date_filter=None, formats=None):
+    """
+    Turn a raw export frame into rows ready for INSERT_SQL, column by column.
+    cols: result of resolve_columns(df.columns)
+    formats: optional per-column formats of an import template (see models/templates.py)
+    """
+    formats = formats or {}
+    df = df.reset_index(drop=True)
+
+    def raw(key):
+        c = cols.get(key)
+        if c is None:
+            return pd.Series(None, index=df.index, dtype=object)
+        return df[c]
+
+    tanggal = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    if cols.get('tanggal') is not None:
+        values = df[cols['tanggal']]
+        if formats.get('tanggal'):
+            # one known format; whatever doesn't match it still gets the per-value parser
+            tanggal = pd.to_datetime(values, format=formats['tanggal'], errors='coerce').astype('datetime64[ns]')
+            left = tanggal.isna() & values.notna()
+            if left.any():
+                tanggal[left] = pd.to_datetime(values[left], errors='coerce', **_DATE_KW)
+        else:
+            tanggal = pd.to_datetime(values, errors='coerce', **_DATE_KW).astype('datetime64[ns]')
+
+    # date filter
+    if date_filter:
+        if isinstance(date_filter, tuple):
+            keep = (tanggal >= pd.to_datetime(date_filter[0])) & (tanggal <= pd.to_datetime(date_filter[1]))
+        else:
+            keep = tanggal.dt.normalize() == pd.to_datetime(date_filter)
+        keep = keep.fillna(False).astype(bool)
+        df = df[keep]
+        tanggal = tanggal[keep]
+
+    today = pd.Timestamp(datetime.today().date())
+    ref = tanggal.dt.normalize().fillna(today)
+    times = {k: parse_time_column(raw(k), ref, formats.get(k, TIME_KINDS)) for k in TIME_COLUMNS}
+    ss = times['start_scheduler']
+    times['finish_scheduler'] = adjust_finish_column(ss, times['finish_scheduler'])
+    times['finish_bridge'] = adjust_finish_column(ss, times['finish_bridge'])
+    fb = times['finish_bridge']
+
+    minutes = ((fb - ss).dt.total_seconds() // 60).fillna(0).clip(lower=0).astype('int64')
+
+    out = pd.DataFrame(index=ref.index)
+    out['tanggal'] = day_column(tanggal)
+    out['aplikasi'] = _object_column(raw('aplikasi'))
+    for k in TIME_COLUMNS:
+        out[k] = epoch_column(times[k])
+    out['duration_minutes'] = minutes.astype(object)
+    out['status'] = _object_column(raw('status'))
+    out['notes'] = _object_column(raw('notes'))
+    return out[INSERT_COLUMNS]
+
+def _dedup_header(header):
+    """
+    Column names as pd.read_excel gives them: blank cells become "Unnamed: i",
+    repeated names "X.1", "X.2", ... skipping names the header already has
+    (the loop of pandas' python parser, named columns first)
+    """
+    names = [c if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+    unnamed = [i for i, c in enumerate(header) if c is None]
+    counts = {}
+    for i in [i for i in range(len(names)) if header[i] is not None] + unnamed:
+        col = old = names[i]
+        count = counts.get(col, 0)
+        while count > 0:
+            counts[old] = count + 1
+            col = f"{old}.{count}"
+            count = count + 1 if col in names else counts.get(col, 0)
+        names[i] = col
+        counts[col] = count + 1
+    return names
+
+def _read_excel_rows(path, sheet_name=None):
+    # openpyxl read-only mode streams rows instead of loading the whole sheet
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.active if sheet_name is None else (
+            wb.worksheets[sheet_name] if isinstance(sheet_name, int) else wb[sheet_name])
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield _dedup_header(header)
+        for r in rows:
+            yield r
+    finally:
+        wb.close()
+
+def iter_frames(path, sheet_name=None, chunksize=CHUNK_ROWS):
+    """Yield the file as DataFrames of at most chunksize rows"""
+    lower = path.lower()
+    if lower.endswith('.csv'):
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            yield chunk
+        return
+    if not lower.endswith('.xlsx') and not lower.endswith('.xlsm'):
+        # legacy .xls has no streaming reader; slice it after loading
+        df = pd.read_excel(path, sheet_name=sheet_name or 0)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+        return
+    rows = _read_excel_rows(path, sheet_name)
+    header = next(rows, None)
+    if header is None:
+        return
+    batch = []
+    blanks = []
+    for r in rows:
+        # blank rows only count when data follows them (trailing ones are sheet padding)
+        if all(v is None for v in r):
+            blanks.append(r)
+            continue
+        if blanks:
+            batch.extend(blanks)
+            blanks = []
+        batch.append(r)
+        if len(batch) >= chunksize:
+            yield pd.DataFrame(batch, columns=header)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch, columns=header)
+
+@timed('import.preview', rows=lambda res: len(res[0]))
 def preview_file(path, sheet_name=None, nrows=200):
+    # only the first nrows are read, whatever the file size
     if path.lower().endswith('.csv'):
-        df = pd.read_csv(path)
+        df = pd.read_csv(path, nrows=nrows)
     else:
-        df = pd.read_excel(path, sheet_name=sheet_name)
+        df = next(iter_frames(path, sheet_name, chunksize=nrows), pd.DataFrame())
     return df.head(nrows), list(df.columns)
 
-def import_from_file(path, sheet_name=None, date_filter=None):
+def file_hash(path, block=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for buf in iter(lambda: f.read(block), b''):
+            h.update(buf)
+    return h.hexdigest()
+
+def _filter_key(date_filter):
+    if not date_filter:
+        return ''
+    if isinstance(date_filter, tuple):
+        return f"{date_filter[0]}..{date_filter[1]}"
+    return str(date_filter)
+
+def _prepared(path, sheet_name=None, date_filter=None, chunksize=CHUNK_ROWS, plans=None, info=None):
     """
-    date_filter: None | 'YYYY-MM-DD' | (from,to) as strings
-    Returns number of rows inserted
+    Yield prepare_frame() batches of the file.
+    plans: known import templates by signature; the file's template is taken
+    from there or detected from the first chunk
+    info: optional dict, filled with read (raw rows), signature, header, plan,
+    detected (new template), read_seconds, detect_seconds and parse_seconds
     """
-    if path.lower().endswith('.csv'):
-        df = pd.read_csv(path)
-    else:
-        df = pd.read_excel(path, sheet_name=sheet_name)
+    info = {} if info is None else info
+    info.update(read=0, read_seconds=0.0, detect_seconds=0.0, parse_seconds=0.0, detected=False)
+    cols = formats = None
+    chunks = iter_frames(path, sheet_name, chunksize)
+    while True:
+        start = perf_counter()
+        chunk = next(chunks, None)
+        info['read_seconds'] += perf_counter() - start
+        if chunk is None:
+            break
+        if cols is None:
+            start = perf_counter()
+            sig = templates.signature(chunk.columns)
+            plan = (plans or {}).get(sig)
+            if plan is None:
+                plan = templates.detect(chunk)
+                info['detected'] = True
+            cols, formats = templates.columns_for(plan, chunk.columns), plan['formats']
+            info.update(signature=sig, plan=plan, header=[str(c) for c in chunk.columns],
+                        detect_seconds=perf_counter() - start)
+        info['read'] += len(chunk)
+        start = perf_counter()
+        frame = prepare_frame(chunk, cols, date_filter, formats)
+        info['parse_seconds'] += perf_counter() - start
+        yield frame
 
-    # lower-case mapping keys
-    cols_map = {c.lower().strip(): c for c in df.columns}
-    def col(names):
-        for k in names:
-            if k in cols_map:
-                return cols_map[k]
-        return None
+def _log_template(path, info, write_seconds, rows):
+    record('import.read', info['read_seconds'], info['read'])
+    record('import.parse', info['parse_seconds'], info['read'])
+    record('import.write', write_seconds, rows)
+    if 'signature' not in info:
+        return
+    if info['detected']:
+        record('import.detect', info['detect_seconds'])
+    log.info("%s: template %s %s in %.3fs, parsed %d rows in %.3fs", path, info['signature'][:12],
+             "detected" if info['detected'] else "reused", info['detect_seconds'], info['read'], info['parse_seconds'])
 
-    col_date = col(['tanggal','date'])
-    col_app = col(['aplikasi','app','application'])
-    col_start_scheduler = col(['start scheduler','start_scheduler','start_scheduler'])
-    col_finish_scheduler = col(['scheduller finish','finish scheduler','finish_scheduler'])
-    col_start_bridge = col(['start bridge','start_bridge','start bridge','start birdge'])
-    col_finish_bridge = col(['finish bridge','finish_bridge'])
-    col_status = col(['status'])
-    col_notes = col(['notes','keterangan','note'])
+def _save_template(conn, info):
+    if info.get('detected'):
+        templates.save(conn, info['signature'], info['header'], info['plan'])
 
-    conn = get_connection()
-    cur = conn.cursor()
+def _write(conn, sql, frames, progress=None, cancelled=None, done=0):
+    """
+    Insert prepared frames inside the caller's transaction; returns rows written
+    (inserted or updated by the upsert, as counted by SQLite)
+    """
+    top = conn.execute("SELECT ifnull(max(id),0) FROM aktivitas").fetchone()[0]
     rows = 0
-    # Use transaction for speed & reliability
-    cur.execute("BEGIN")
-    for _, row in df.iterrows():
-        # parse date if exists
-        tanggal_dt = None
-        if col_date and not pd.isna(row.get(col_date)):
-            try:
-                tanggal_dt = pd.to_datetime(row.get(col_date))
-            except:
-                tanggal_dt = None
-        # date filter
-        if date_filter:
-            if isinstance(date_filter, tuple):
-                if tanggal_dt is None:
-                    continue
-                if not (pd.to_datetime(date_filter[0]) <= tanggal_dt <= pd.to_datetime(date_filter[1])):
-                    continue
-            else:
-                if tanggal_dt is None:
-                    continue
-                if pd.to_datetime(date_filter) != tanggal_dt.normalize():
-                    continue
+    for frame in frames:
+        check_cancelled(cancelled)
+        before = conn.total_changes
+        conn.executemany(sql, frame.itertuples(index=False, name=None))
+        rows += conn.total_changes - before
+        summary.mark(conn, frame[['tanggal','aplikasi']].drop_duplicates().itertuples(index=False, name=None))
+        if progress:
+            progress(done + rows)
+    summary.refresh(conn)
+    # fewer new ids than rows: some rows hit NATURAL_KEY and updated existing ones
+    if conn.execute("SELECT COUNT(*) FROM aktivitas WHERE id > ?", (top,)).fetchone()[0] < rows:
+        colcache.touch(conn)
+    return rows
+
+def _record(conn, digest, fkey, path, rows):
+    conn.execute("INSERT OR REPLACE INTO import_files (file_hash,date_filter,path,rows,imported_at) VALUES (?,?,?,?,?)",
+                 (digest, fkey, str(path), rows, datetime.now().isoformat(timespec='seconds')))
 
-        ref_date = tanggal_dt if tanggal_dt is not None else datetime.today()
-        ss = parse_time_value(row.get(col_start_scheduler), ref_date)
-        fs = parse_time_value(row.get(col_finish_scheduler), ref_date)
-        sb = parse_time_value(row.get(col_start_bridge), ref_date)
-        fb = parse_time_value(row.get(col_finish_bridge), ref_date)
-
-        fs = adjust_finish(ss, fs)
-        fb = adjust_finish(ss, fb)
-
-        duration_minutes = 0
-        if ss and fb:
-            duration_minutes = int((fb - ss).total_seconds() // 60)
-            if duration_minutes < 0:
-                duration_minutes = 0
-
-        cur.execute("""
-            INSERT INTO aktivitas (
-                tanggal, aplikasi, start_scheduler, finish_scheduler,
-                start_bridge, finish_bridge, duration_minutes, status, notes
-            ) VALUES (?,?,?,?,?,?,?,?,?)
-        """, (
-            tanggal_dt.strftime("%Y-%m-%d") if tanggal_dt is not None else None,
-            row.get(col_app) if col_app else None,
-            ss.isoformat() if ss else None,
-            fs.isoformat() if fs else None,
-            sb.isoformat() if sb else None,
-            fb.isoformat() if fb else None,
-            duration_minutes,
-            row.get(col_status) if col_status else None,
-            row.get(col_notes) if col_notes else None
-        ))
-        rows += 1
-    cur.execute("COMMIT")
-    conn.close()
+def _seen(conn, digest, fkey):
+    return conn.execute("SELECT 1 FROM import_files WHERE file_hash=? AND date_filter=?", (digest, fkey)).fetchone() is not None
+
+@timed('import.file', rows=lambda n: n)
+def import_from_file(path, sheet_name=None, date_filter=None, chunksize=CHUNK_ROWS,
+                     upsert=True, force=False, progress=None, cancelled=None):
+    """
+    date_filter: None | 'YYYY-MM-DD' | (from,to) as strings
+    The file is read, parsed and inserted chunksize rows at a time.
+    upsert: rows already in the table (same NATURAL_KEY) are updated instead of duplicated
+    force: import even if this exact file was already imported with the same filter
+    progress(rows) is called after every chunk; cancelled() is checked before
+    each chunk and raises Cancelled (nothing is kept) when it returns True
+    Returns number of rows inserted/updated, or None when the file was skipped
+    (already imported with this filter and not forced)
+    """
+    digest = file_hash(path)
+    fkey = _filter_key(date_filter)
+    conn = get_connection()
+    if not force and _seen(conn, digest, fkey):
+        return None
+    sql = UPSERT_SQL if upsert else INSERT_SQL
+    info = {}
+    start = perf_counter()
+    # Use transaction for speed & reliability
+    with transaction(conn):
+        frames = _prepared(path, sheet_name, date_filter, chunksize, templates.load(conn), info)
+        rows = _write(conn, sql, frames, progress, cancelled)
+        _save_template(conn, info)
+        _record(conn, digest, fkey, path, rows)
+    # reading and parsing happen inside _write as it pulls the frames
+    _log_template(path, info, perf_counter() - start - info['read_seconds'] - info['parse_seconds'], rows)
+    # new rows go into the column cache now, not on the next clustering / plot
+    colcache.load(conn)
     return rows
+
+# files picked up when import_files is given a directory
+IMPORT_PATTERNS = ('*.xlsx', '*.xlsm', '*.xls', '*.csv')
+
+def expand_paths(paths):
+    """Files, directories (IMPORT_PATTERNS inside) and glob patterns -> sorted unique file list"""
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    found = []
+    for p in map(str, paths):
+        if os.path.isdir(p):
+            for pattern in IMPORT_PATTERNS:
+                found += glob.glob(os.path.join(p, pattern))
+        elif glob.has_magic(p):
+            found += glob.glob(p)
+        else:
+            found.append(p)
+    return sorted(set(found))
+
+def _parse_file(path, sheet_name, date_filter, chunksize, plans):
+    # runs in a worker process: read + parse the whole file, the parent writes it
+    start = perf_counter()
+    info = {}
+    frames = list(_prepared(path, sheet_name, date_filter, chunksize, plans, info))
+    info['seconds'] = perf_counter() - start
+    return frames, info
+
+@timed('import.batch', rows=lambda res: res['rows'])
+def import_files(paths, sheet_name=None, date_filter=None, chunksize=CHUNK_ROWS, workers=None,
+                 upsert=True, force=False, progress=None, cancelled=None):
+    """
+    Import many files: parsing runs in a process pool, the calling thread is the
+    only writer and stores each file in its own transaction as soon as it is parsed.
+    At most one file per worker is queued ahead of the writer, so the parsed
+    frames held here are bounded by workers + 1 files, not by the file count.
+    paths: files, directories or glob patterns (see expand_paths)
+    workers: parser processes (default: one per CPU, at most one per file)
+    Other arguments as for import_from_file; progress(rows) counts over all files.
+    On cancel, files already written stay imported.
+    Returns {'rows': total written, 'seconds': wall time, 'files': [per-file stats]}
+    with stats keys path, rows, read, filtered (outside date_filter), rejects
+    (rows without a parseable tanggal, stored with a NULL date), parse_seconds,
+    write_seconds, template ('detected' or 'reused'), detect_seconds,
+    skipped (already imported) and error (file could not be read).
+    """
+    start = perf_counter()
+    fkey = _filter_key(date_filter)
+    sql = UPSERT_SQL if upsert else INSERT_SQL
+    conn = get_connection()
+    stats = []
+    todo = {}
+    for path in expand_paths(paths):
+        st = {'path': path, 'rows': 0, 'read': 0, 'filtered': 0, 'rejects': 0,
+              'parse_seconds': 0.0, 'write_seconds': 0.0, 'template': None, 'detect_seconds': 0.0,
+              'skipped': False, 'error': None}
+        stats.append(st)
+        digest = file_hash(path)
+        if not force and _seen(conn, digest, fkey):
+            st['skipped'] = True
+        else:
+            todo[path] = (st, digest)
+    total = 0
+    if todo:
+        workers = pool_size(workers, len(todo))
+        pool = spawn_pool(workers)
+        try:
+            plans = templates.load(conn)
+            queue = iter(todo)
+            futures = {}
+
+            def submit():
+                path = next(queue, None)
+                if path is not None:
+                    futures[pool.submit(_parse_file, path, sheet_name, date_filter, chunksize, plans)] = path
+
+            for _ in range(workers):
+                submit()
+            while futures:
+                fut = next(iter(wait(futures, return_when=FIRST_COMPLETED)[0]))
+                path = futures.pop(fut)
+                # the next file parses while this one is written
+                submit()
+                check_cancelled(cancelled)
+                st, digest = todo[path]
+                try:
+                    frames, info = fut.result()
+                except Exception as e:
+                    st['error'] = str(e)
+                    continue
+                st['read'], st['parse_seconds'] = info['read'], info['seconds']
+                st['template'] = 'detected' if info['detected'] else 'reused'
+                st['detect_seconds'] = info['detect_seconds']
+                t0 = perf_counter()
+                with transaction(conn):
+                    st['rows'] = _write(conn, sql, frames, progress, cancelled, total)
+                    # several workers may have detected the same new template; the first one is kept
+                    _save_template(conn, info)
+                    _record(conn, digest, fkey, path, st['rows'])
+                st['write_seconds'] = perf_counter() - t0
+                _log_template(path, info, st['write_seconds'], st['rows'])
+                st['filtered'] = st['read'] - st['rows']
+                st['rejects'] = int(sum(f['tanggal'].isna().sum() for f in frames))
+                total += st['rows']
+                # this file's frames go now, not after the next wait
+                del fut, frames
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+    if total:
+        colcache.load(conn)
+    return {'rows': total, 'seconds': perf_counter() - start, 'files': stats}
@@ -0,0 +1,56 @@
+# app/models/kmeans1d.py
+import numpy as np
+
+def _segment_cost(W, S, Q, j, i):
+    # within-cluster sum of squares of sorted values j..i-1 from prefix sums
+    n = W[i] - W[j]
+    s = S[i] - S[j]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(n > 0, (Q[i] - Q[j]) - s * s / np.where(n > 0, n, 1), 0.0)
+
+def kmeans_1d(x, k):
+    """
+    Exact (globally optimal) k-means for one-dimensional data.
+    Equal values always share a cluster, so the work is done on the sorted
+    unique values weighted by their counts: a single vectorized scan over the
+    split points for k=2, a prefix-sum dynamic program otherwise.
+    Returns (labels, centroids) with centroids sorted ascending and labels
+    indexing them.
+    """
+    x = np.asarray(x, dtype=float)
+    values, inverse, counts = np.unique(x, return_inverse=True, return_counts=True)
+    u = len(values)
+    k = max(1, min(k, u))
+    w = counts.astype(float)
+    W = np.concatenate(([0.0], np.cumsum(w)))
+    S = np.concatenate(([0.0], np.cumsum(w * values)))
+    Q = np.concatenate(([0.0], np.cumsum(w * values * values)))
+
+    if k == 1:
+        bounds = [0, u]
+    elif k == 2:
+        split = np.arange(1, u)
+        cost = _segment_cost(W, S, Q, 0, split) + _segment_cost(W, S, Q, split, u)
+        bounds = [0, int(split[np.argmin(cost)]), u]
+    else:
+        # D[m, i]: best cost of putting the first i values into m+1 clusters
+        D = np.full((k, u + 1), np.inf)
+        B = np.zeros((k, u + 1), dtype=int)
+        D[0, 1:] = _segment_cost(W, S, Q, 0, np.arange(1, u + 1))
+        for m in range(1, k):
+            for i in range(m + 1, u + 1):
+                j = np.arange(m, i)
+                c = D[m - 1, j] + _segment_cost(W, S, Q, j, i)
+                b = int(np.argmin(c))
+                D[m, i] = c[b]
+                B[m, i] = j[b]
+        bounds = [u]
+        for m in range(k - 1, 0, -1):
+            bounds.append(B[m, bounds[-1]])
+        bounds.append(0)
+        bounds = bounds[::-1]
+
+    bounds = np.asarray(bounds)
+    centroids = (S[bounds[1:]] - S[bounds[:-1]]) / (W[bounds[1:]] - W[bounds[:-1]])
+    value_label = np.searchsorted(bounds[1:], np.arange(u), side='right')
+    return value_label[inverse], centroids
@@ -0,0 +1,62 @@
+# app/models/summary.py
+# aktivitas_summary holds count / duration stats per (tanggal, aplikasi, cluster).
+# Writers mark the (tanggal, aplikasi) groups they touch; refresh() then
+# recomputes only those groups from aktivitas inside the caller's transaction.
+# tanggal is the day number like in aktivitas; a NULL tanggal is stored as -1,
+# a NULL aplikasi as '' and a NULL cluster as 0.
+# aplikasi_lookup (distinct aplikasi for the filter combo) is kept in step.
+
+KEYS_TABLE = "summary_keys"
+
+def _keys(conn):
+    conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {KEYS_TABLE} (tanggal INTEGER, aplikasi TEXT)")
+
+def mark(conn, pairs):
+    """Mark (tanggal, aplikasi) pairs as stale"""
+    _keys(conn)
+    conn.executemany(f"INSERT INTO {KEYS_TABLE} (tanggal, aplikasi) VALUES (?,?)", pairs)
+
+def mark_query(conn, sql, params=()):
+    """Mark the groups returned by a SELECT tanggal, aplikasi ... query"""
+    _keys(conn)
+    conn.execute(f"INSERT INTO {KEYS_TABLE} (tanggal, aplikasi) {sql}", params)
+
+def refresh(conn):
+    """Recompute the marked groups"""
+    _keys(conn)
+    conn.execute(f"""
+        DELETE FROM aktivitas_summary
+        WHERE (tanggal, aplikasi) IN (SELECT DISTINCT ifnull(tanggal,-1), ifnull(aplikasi,'') FROM {KEYS_TABLE})
+    """)
+    conn.execute(f"""
+        INSERT INTO aktivitas_summary (tanggal, aplikasi, cluster, n, total_duration, min_duration, max_duration)
+        SELECT ifnull(a.tanggal,-1), ifnull(a.aplikasi,''), ifnull(a.cluster,0), COUNT(*),
+               SUM(ifnull(a.duration_minutes,0)), MIN(a.duration_minutes), MAX(a.duration_minutes)
+        FROM (SELECT DISTINCT tanggal, aplikasi FROM {KEYS_TABLE}) k
+        JOIN aktivitas a ON a.tanggal IS k.tanggal AND a.aplikasi IS k.aplikasi
+        GROUP BY 1, 2, 3
+    """)
+    # aplikasi_lookup follows the aplikasi values still present in the summary
+    conn.execute(f"""
+        INSERT OR IGNORE INTO aplikasi_lookup (aplikasi)
+        SELECT DISTINCT aplikasi FROM {KEYS_TABLE} WHERE aplikasi IS NOT NULL AND aplikasi <> ''
+    """)
+    conn.execute(f"""
+        DELETE FROM aplikasi_lookup
+        WHERE aplikasi IN (SELECT aplikasi FROM {KEYS_TABLE})
+          AND NOT EXISTS (SELECT 1 FROM aktivitas_summary s WHERE s.aplikasi = aplikasi_lookup.aplikasi)
+    """)
+    conn.execute(f"DELETE FROM {KEYS_TABLE}")
+
+def rebuild(conn):
+    """Recompute the whole summary table"""
+    conn.execute("DELETE FROM aktivitas_summary")
+    conn.execute("""
+        INSERT INTO aktivitas_summary (tanggal, aplikasi, cluster, n, total_duration, min_duration, max_duration)
+        SELECT ifnull(tanggal,-1), ifnull(aplikasi,''), ifnull(cluster,0), COUNT(*),
+               SUM(ifnull(duration_minutes,0)), MIN(duration_minutes), MAX(duration_minutes)
+        FROM aktivitas
+        GROUP BY 1, 2, 3
+    """)
+    conn.execute("DELETE FROM aplikasi_lookup")
+    conn.execute("INSERT INTO aplikasi_lookup SELECT DISTINCT aplikasi FROM aktivitas_summary WHERE aplikasi <> ''")
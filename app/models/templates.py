@@ -0,0 +1,70 @@
+# app/models/templates.py
+# Import templates: the scheduler exports come in a few recurring layouts.
+# The first file of a layout gets its column mapping and per-column formats
+# detected from a sample; the resulting plan is stored in import_templates
+# under the header signature, and later files with the same header reuse it.
+import json
+import hashlib
+from datetime import datetime
+import pandas as pd
+
+# rows looked at when detecting a new template
+SAMPLE_ROWS = 200
+
+# tanggal formats used instead of per-value parsing when the whole sample
+# matches; only year-first ones, which can't disagree with the mixed parser
+DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y/%m/%d')
+
+def signature(columns):
+    """Stable key for a header row"""
+    text = "\x1f".join(str(c).strip().lower() for c in columns)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def _date_format(values):
+    values = values.dropna()
+    if values.empty or pd.api.types.is_datetime64_any_dtype(values):
+        return None
+    if not all(isinstance(v, str) for v in values):
+        return None
+    for fmt in DATE_FORMATS:
+        if pd.to_datetime(values, format=fmt, errors='coerce').notna().all():
+            return fmt
+    return None
+
+def detect(df):
+    """Plan for a raw export frame: column positions + tanggal/time formats"""
+    # imported here: importer imports this module
+    from .importer import resolve_columns, parse_time_column, clock_layout, TIME_COLUMNS, TIME_KINDS
+    sample = df.head(SAMPLE_ROWS).reset_index(drop=True)
+    cols = resolve_columns(sample.columns)
+    position = {label: i for i, label in enumerate(sample.columns)}
+    plan = {'columns': {k: (None if c is None else position[c]) for k, c in cols.items()}, 'formats': {}}
+    if cols.get('tanggal') is not None:
+        plan['formats']['tanggal'] = _date_format(sample[cols['tanggal']])
+    ref = pd.Series(pd.Timestamp(datetime.today().date()), index=sample.index)
+    for k in TIME_COLUMNS:
+        if cols.get(k) is None:
+            continue
+        claimed = {}
+        parse_time_column(sample[cols[k]], ref, claimed=claimed)
+        kinds = [kind for kind in TIME_KINDS if claimed.get(kind)]
+        # all clock cells in one fixed layout: parse them by position instead of the regex
+        layout = clock_layout(sample[cols[k]]) if 'clock' in kinds else None
+        if layout:
+            kinds[kinds.index('clock')] = layout
+        plan['formats'][k] = kinds or list(TIME_KINDS)
+    return plan
+
+def columns_for(plan, columns):
+    """Column mapping (key -> label in columns) of a plan"""
+    return {k: (None if i is None else columns[i]) for k, i in plan['columns'].items()}
+
+def load(conn):
+    """All stored plans, by signature"""
+    rows = conn.execute("SELECT signature, plan FROM import_templates").fetchall()
+    return {sig: json.loads(plan) for sig, plan in rows}
+
+def save(conn, sig, header, plan):
+    conn.execute("INSERT OR IGNORE INTO import_templates (signature, header, plan, created_at) VALUES (?,?,?,?)",
+                 (sig, json.dumps(header), json.dumps(plan),
+                  datetime.now().isoformat(timespec='seconds')))
@@ -0,0 +1,65 @@
+# app/models/timestamps.py
+# aktivitas keeps its times as integers: the four scheduler/bridge columns as
+# epoch seconds and tanggal as a day number (days since 1970-01-01), both in
+# naive local time. Range filters are integer comparisons and analysis code
+# turns whole columns into datetime64 without parsing text.
+# db.py imports this module for the SQL constants, so pandas/numpy are only
+# imported inside the converters (keeps GUI/CLI startup light).
+
+DAY_COLUMNS = ('tanggal',)
+EPOCH_COLUMNS = ('start_scheduler', 'finish_scheduler', 'start_bridge', 'finish_bridge')
+
+# SQL giving the old text form of each typed column (aktivitas_text view, exports)
+TEXT_FORMS = {
+    'tanggal': "date(tanggal * 86400, 'unixepoch')",
+    **{c: f"strftime('%Y-%m-%dT%H:%M:%S', {c}, 'unixepoch')" for c in EPOCH_COLUMNS},
+}
+
+def text_select(columns):
+    """SELECT list for columns with the typed ones rendered as text"""
+    return ", ".join(f"{TEXT_FORMS[c]} AS {c}" if c in TEXT_FORMS else c for c in columns)
+
+def _int_column(values, mask):
+    # plain python ints for sqlite, missing -> None
+    import pandas as pd
+    out = pd.Series(values, index=mask.index).astype(object)
+    out[mask.to_numpy()] = None
+    return out
+
+def epoch_column(dt):
+    """datetime64 Series -> epoch seconds (object Series, None for NaT)"""
+    dt = dt.astype('datetime64[ns]')
+    return _int_column(dt.to_numpy().astype('datetime64[s]').astype('int64'), dt.isna())
+
+def day_column(dt):
+    """datetime64 Series -> day numbers (object Series, None for NaT)"""
+    dt = dt.astype('datetime64[ns]')
+    return _int_column(dt.to_numpy().astype('datetime64[D]').astype('int64'), dt.isna())
+
+def from_epoch(values):
+    """epoch seconds column -> datetime64 Series"""
+    import pandas as pd
+    return pd.to_datetime(values, unit='s')
+
+def from_day(values):
+    """day number column -> datetime64 Series"""
+    import pandas as pd
+    return pd.to_datetime(values, unit='D')
+
+def to_epoch(value):
+    """Single value (text, datetime, epoch int) -> epoch seconds or None"""
+    import numpy as np
+    import pandas as pd
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    ts = pd.to_datetime(value, errors='coerce')
+    return None if pd.isna(ts) else int(ts.value // 10**9)
+
+def to_day(value):
+    """Single value (text, date, day number) -> day number or None"""
+    import numpy as np
+    import pandas as pd
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    ts = pd.to_datetime(value, errors='coerce')
+    return None if pd.isna(ts) else int(ts.value // (86400 * 10**9))
@@ -1,9 +1,18 @@
 # app/utils/export_pdf.py
-from reportlab.lib.pagesizes import A4
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfgen import canvas
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet
+from app.models.db import check_cancelled
+from app.utils.metrics import timed
 
+MARGIN = 36
+FONT_SIZE = 6
+ROW_HEIGHT = 10
+TITLE_HEIGHT = 30
+
+@timed('pdf.table_layout', rows=lambda n: n)
 def export_df_to_pdf(df, file_path, title="Report"):
     doc = SimpleDocTemplate(file_path, pagesize=A4)
     style = getSampleStyleSheet()
@@ -19,3 +28,83 @@ def export_df_to_pdf(df, file_path, title="Report"):
     ]))
     elems.append(table)
     doc.build(elems)
+    return len(df)
+
+def _cell(val, max_chars):
+    s = "" if val is None else str(val)
+    return s if len(s) <= max_chars else s[:max_chars - 1] + "…"
+
+@timed('pdf.render', rows=lambda n: n)
+def export_rows_to_pdf(columns, chunks, file_path, title="Report", landscape_mode=False,
+                       col_widths=None, progress=None, cancelled=None):
+    """
+    Streaming PDF writer: every page is drawn straight onto the canvas with
+    fixed column widths and row height (no platypus layout or splitting), so
+    only one page of rows is held at a time. The canvas still keeps each
+    finished page's content stream (~9 KB) until save(), so memory grows
+    with the page count, far slower than with the Table layout.
+    columns: header names; chunks: iterable of row-tuple lists
+    col_widths: points per column (default: page width split evenly)
+    Returns number of rows written
+    """
+    pagesize = landscape(A4) if landscape_mode else A4
+    width, height = pagesize
+    avail_w = width - 2 * MARGIN
+    if col_widths is None:
+        col_widths = [avail_w / len(columns)] * len(columns)
+    xs = [MARGIN]
+    for w in col_widths:
+        xs.append(xs[-1] + w)
+    # rough chars that fit in a column at FONT_SIZE (Helvetica averages ~0.5em)
+    max_chars = [max(4, int((w - 4) / (FONT_SIZE * 0.5))) for w in col_widths]
+    header = [_cell(c, m) for c, m in zip(columns, max_chars)]
+
+    c = canvas.Canvas(file_path, pagesize=pagesize)
+    c.setTitle(title)
+    state = {"page": 0, "rows": 0}
+
+    def rows_per_page():
+        top = TITLE_HEIGHT if state["page"] == 0 else 0
+        return int((height - 2 * MARGIN - top) // ROW_HEIGHT) - 1
+
+    def draw_page(rows):
+        top = height - MARGIN
+        if state["page"] == 0:
+            c.setFont("Helvetica-Bold", 14)
+            c.drawString(MARGIN, top - 16, title)
+            top -= TITLE_HEIGHT
+        n = len(rows) + 1
+        c.setFillColor(colors.grey)
+        c.rect(xs[0], top - ROW_HEIGHT, xs[-1] - xs[0], ROW_HEIGHT, stroke=0, fill=1)
+        c.setFillColor(colors.black)
+        c.setLineWidth(0.25)
+        c.grid(xs, [top - i * ROW_HEIGHT for i in range(n + 1)])
+        # one text block per column, lines advance by ROW_HEIGHT
+        for j, x in enumerate(xs[:-1]):
+            text = c.beginText(x + 2, top - ROW_HEIGHT + 3)
+            text.setFont("Helvetica", FONT_SIZE, ROW_HEIGHT)
+            text.textLine(header[j])
+            m = max_chars[j]
+            for r in rows:
+                text.textLine(_cell(r[j], m))
+            c.drawText(text)
+        state["page"] += 1
+        c.setFont("Helvetica", 7)
+        c.drawRightString(width - MARGIN, MARGIN / 2, f"Page {state['page']}")
+        c.showPage()
+        state["rows"] += len(rows)
+        if progress:
+            progress(state["rows"])
+
+    page = []
+    for chunk in chunks:
+        for row in chunk:
+            page.append(row)
+            if len(page) >= rows_per_page():
+                check_cancelled(cancelled)
+                draw_page(page)
+                page = []
+    if page or state["page"] == 0:
+        draw_page(page)
+    c.save()
+    return state["rows"]
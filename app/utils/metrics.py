@@ -0,0 +1,209 @@
+# app/utils/metrics.py
+# Timing instrumentation for the data path (import, clustering, queries, exports).
+# Operations are wrapped with @timed(...) or `with measure(...)`; each run
+# records its duration, row count, resident memory at its end and the change
+# of it over the run into the metrics table. Records are buffered in memory
+# and written by a background thread on its own short-lived connection: timed
+# calls never wait for the DB, a long write transaction only delays the flush.
+#
+# AKTIVITAS_METRICS=0   turns recording off (wrappers just call through)
+# AKTIVITAS_PROFILE=1   also dumps a cProfile .prof per top-level operation
+#                       into data/profiles (or the directory given instead of 1)
+import os
+import mmap
+import atexit
+import sqlite3
+import threading
+import functools
+import cProfile
+from time import perf_counter
+from pathlib import Path
+from datetime import datetime
+from app.models import db
+
+ENABLED = os.environ.get("AKTIVITAS_METRICS", "1") != "0"
+PROFILE = os.environ.get("AKTIVITAS_PROFILE", "")
+
+# measurements kept in memory while the DB can't take them (oldest dropped first)
+MAX_BUFFER = 10000
+# rows kept in the metrics table; each flush drops the oldest beyond this
+MAX_ROWS = 50000
+# seconds the flush thread waits for the write lock / between retries while it's taken
+FLUSH_TIMEOUT = 0.5
+FLUSH_RETRY = 2.0
+
+_buffer = []
+_lock = threading.Lock()
+_local = threading.local()
+_wake = threading.Event()
+_flusher = None
+
+def rss_mb():
+    """
+    Current resident set size of the process in MB (None where /proc is missing).
+    Not ru_maxrss: that is the peak over the process lifetime, so after one big
+    import every later operation would report it.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * mmap.PAGESIZE / 2 ** 20
+    except (OSError, IndexError, ValueError):
+        return None
+
+def _profile_dir():
+    path = db.DATA_DIR / "profiles" if PROFILE == "1" else os.path.expanduser(PROFILE)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+class measure:
+    """
+    Context manager timing one operation:
+        with measure("report.pdf") as m:
+            ...
+            m.rows = n
+    """
+    __slots__ = ("op", "rows", "_start", "_rss", "_profiler", "_top")
+
+    def __init__(self, op, rows=None):
+        self.op = op
+        self.rows = rows
+
+    def __enter__(self):
+        if not ENABLED:
+            return self
+        depth = getattr(_local, "depth", 0)
+        _local.depth = depth + 1
+        self._top = depth == 0
+        # cProfile can't nest; the outermost operation of the thread gets it
+        self._profiler = cProfile.Profile() if PROFILE and self._top else None
+        if self._profiler:
+            self._profiler.enable()
+        self._rss = rss_mb()
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if not ENABLED:
+            return False
+        seconds = perf_counter() - self._start
+        _local.depth -= 1
+        if self._profiler:
+            self._profiler.disable()
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            self._profiler.dump_stats(os.path.join(_profile_dir(), f"{self.op}_{stamp}.prof"))
+        record(self.op, seconds, self.rows, failed=exc[0] is not None, rss_start=self._rss)
+        if self._top:
+            _schedule_flush()
+        return False
+
+def timed(op, rows=None):
+    """
+    Decorator form of measure.
+    rows: optional callable(result) -> row count to record
+    """
+    def wrap(func):
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            with measure(op) as m:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    m.rows = rows(result)
+                return result
+        return inner
+    return wrap
+
+def record(op, seconds, rows=None, failed=False, rss_start=None):
+    """
+    Add one measurement (for timings taken by hand, e.g. summed over chunks)
+    rss_start: rss_mb() when the operation began, for the memory delta. RSS is
+    per process, so jobs running at the same time show in each other's delta,
+    and memory taken and released within the operation is not seen.
+    """
+    if not ENABLED:
+        return
+    rss = rss_mb()
+    delta = None if rss is None or rss_start is None else rss - rss_start
+    with _lock:
+        _buffer.append((op, datetime.now().isoformat(timespec='milliseconds'), seconds,
+                        None if rows is None else int(rows), rss, delta, int(failed),
+                        threading.current_thread().name))
+        del _buffer[:-MAX_BUFFER]
+
+def _schedule_flush():
+    global _flusher
+    with _lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True)
+            _flusher.start()
+    _wake.set()
+
+def _flush_loop():
+    while True:
+        # idle until the next top-level operation; retry now and then while the DB is busy
+        _wake.wait(FLUSH_RETRY if _buffer else None)
+        _wake.clear()
+        flush()
+
+def flush(timeout=FLUSH_TIMEOUT):
+    """
+    Write buffered measurements; kept for the next flush when the DB is busy.
+    timeout: seconds to wait for the write lock (0: give up at once)
+    """
+    with _lock:
+        pending = list(_buffer)
+        _buffer.clear()
+    if not pending:
+        return
+    try:
+        # mode=rw: never creates a DB file that was moved or removed meanwhile
+        conn = sqlite3.connect(Path(db.DB_PATH).resolve().as_uri() + "?mode=rw", timeout=timeout, uri=True)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                conn.executemany("""INSERT INTO metrics (op, finished_at, seconds, rows, rss_mb, rss_delta_mb,
+                                                         failed, thread)
+                                    VALUES (?,?,?,?,?,?,?,?)""", pending)
+                # retention: ids only grow (AUTOINCREMENT), so this is a range delete on the key
+                conn.execute("DELETE FROM metrics WHERE id <= (SELECT MAX(id) FROM metrics) - ?", (MAX_ROWS,))
+        finally:
+            conn.close()
+    except sqlite3.OperationalError:
+        with _lock:
+            _buffer[:0] = pending
+            del _buffer[:-MAX_BUFFER]
+
+# whatever the flush thread didn't get to (e.g. a short CLI run)
+atexit.register(flush)
+
+def summary(limit=None):
+    """Per-operation totals from the metrics table (DataFrame), slowest total first"""
+    import pandas as pd
+    # the view may lag behind a running write; it never waits for it
+    flush(timeout=0)
+    q = """
+        SELECT op, COUNT(*) AS calls, ROUND(SUM(seconds), 3) AS total_s, ROUND(AVG(seconds), 4) AS mean_s,
+               ROUND(MAX(seconds), 4) AS max_s, SUM(rows) AS rows,
+               ROUND(SUM(rows) / NULLIF(SUM(CASE WHEN rows IS NOT NULL THEN seconds END), 0)) AS rows_per_s,
+               ROUND(MAX(rss_delta_mb), 1) AS max_rss_delta_mb, ROUND(MAX(rss_mb), 1) AS max_rss_mb, SUM(failed) AS failed, MAX(finished_at) AS last_run
+        FROM metrics GROUP BY op ORDER BY SUM(seconds) DESC
+    """
+    if limit:
+        q += f" LIMIT {int(limit)}"
+    return pd.read_sql_query(q, db.get_connection())
+
+def recent(limit=200):
+    """Latest measurements, newest first (DataFrame)"""
+    import pandas as pd
+    flush(timeout=0)
+    return pd.read_sql_query("""SELECT finished_at, op, ROUND(seconds, 4) AS seconds, rows,
+                                       ROUND(rss_mb, 1) AS rss_mb, ROUND(rss_delta_mb, 1) AS rss_delta_mb,
+                                       failed, thread
+                                FROM metrics ORDER BY id DESC LIMIT ?""", db.get_connection(), params=(limit,))
+
+def clear():
+    with _lock:
+        _buffer.clear()
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM metrics")
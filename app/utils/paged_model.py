@@ -0,0 +1,96 @@
+# app/utils/paged_model.py
+from collections import OrderedDict
+from PyQt5.QtCore import QAbstractTableModel, Qt, QVariant, QModelIndex
+
+class PagedTableModel(QAbstractTableModel):
+    """
+    Read-only table model that pulls rows page by page.
+    count_fn() -> total rows
+    page_fn(after, limit) -> (columns, rows); after is the keyset cursor
+    (key_fn(last row of the previous page)) or None for the first page.
+    Rows are exposed through canFetchMore/fetchMore, and only the last
+    max_pages fetched pages are kept in memory (LRU).
+    """
+    def __init__(self, count_fn=None, page_fn=None, key_fn=None, page_size=500, max_pages=20):
+        super().__init__()
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._columns = []
+        self._pages = OrderedDict()
+        self._reset_state(count_fn, page_fn, key_fn)
+
+    def _reset_state(self, count_fn, page_fn, key_fn, first=None):
+        self._count_fn = count_fn
+        self._page_fn = page_fn
+        self._key_fn = key_fn
+        self._pages.clear()
+        self._cursors = [None]   # cursor to start page i
+        self._loaded = 0
+        self._total = 0
+        if count_fn is not None:
+            self._total, fetched = first if first is not None else (count_fn(), None)
+            # first page gives the column names and the initial rows
+            self._loaded = len(self._page(0, fetched))
+
+    def set_source(self, count_fn, page_fn, key_fn, first=None):
+        """
+        first: optional (total, (columns, rows)) already fetched for page 0,
+        e.g. on a worker thread, so the reset itself runs no query
+        """
+        self.beginResetModel()
+        self._reset_state(count_fn, page_fn, key_fn, first)
+        self.endResetModel()
+
+    def _page(self, i, fetched=None):
+        if i in self._pages:
+            self._pages.move_to_end(i)
+            return self._pages[i]
+        # walk forward from the nearest known cursor
+        while len(self._cursors) <= i:
+            if not self._page(len(self._cursors) - 1):
+                return []
+        columns, rows = fetched or self._page_fn(self._cursors[i], self.page_size)
+        if columns:
+            self._columns = columns
+        if rows and len(self._cursors) == i + 1:
+            self._cursors.append(self._key_fn(columns, rows[-1]))
+        self._pages[i] = rows
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return rows
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < self._total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        n = min(self.page_size, self._total - self._loaded)
+        if n <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + n - 1)
+        self._loaded += n
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return QVariant()
+        rows = self._page(index.row() // self.page_size)
+        r = index.row() % self.page_size
+        if r >= len(rows):
+            return QVariant()
+        val = rows[r][index.column()]
+        return "" if val is None else str(val)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Horizontal:
+            return self._columns[section] if section < len(self._columns) else QVariant()
+        return str(section)
@@ -1,15 +1,61 @@
 # app/utils/pandas_model.py
+import numpy as np
 from PyQt5.QtCore import QAbstractTableModel, Qt, QVariant
+from app.utils.metrics import measure
+
+def _fmt_datetime(s):
+    return s.dt.strftime('%Y-%m-%d %H:%M:%S')
+
+def _fmt_float(s):
+    # whole numbers without the trailing ".0"
+    whole = np.isfinite(s) & (s == s.round())
+    out = s.astype(str)
+    out[whole] = s[whole].astype('int64').astype(str)
+    return out
+
+def _fmt_default(s):
+    return s.astype(str)
+
+# display formatter per numpy dtype kind; NaN/NaT/None always render as ""
+FORMATTERS = {
+    'M': _fmt_datetime,
+    'f': _fmt_float,
+}
+
+NUMERIC_KINDS = 'iufc'
+
+def format_column(series):
+    """Render a column once into an object array of display strings"""
+    fmt = FORMATTERS.get(series.dtype.kind, _fmt_default)
+    out = fmt(series).to_numpy(dtype=object, copy=True)
+    out[series.isna().to_numpy()] = ""
+    return out
 
 class PandasModel(QAbstractTableModel):
     def __init__(self, df=None):
         super().__init__()
-        self._df = df
+        self._df = None
+        self._cells = []
+        self._index = None
+        self._align = []
+        self._order = None
+        self.update(df)
 
     def update(self, df):
-        self.beginResetModel()
-        self._df = df
-        self.endResetModel()
+        with measure('ui.model_update', rows=0 if df is None else len(df)):
+            self.beginResetModel()
+            self._df = df
+            # string renderings are computed here, not on every repaint
+            if df is None:
+                self._cells, self._index, self._align = [], None, []
+                self._order = None
+            else:
+                self._cells = [format_column(df.iloc[:, c]) for c in range(df.shape[1])]
+                self._index = format_column(df.index.to_series())
+                self._align = [(Qt.AlignRight if df.dtypes.iloc[c].kind in NUMERIC_KINDS else Qt.AlignLeft) | Qt.AlignVCenter
+                               for c in range(df.shape[1])]
+                self._order = np.arange(len(df.index))
+            self.endResetModel()
 
     def rowCount(self, parent=None):
         return 0 if self._df is None else len(self._df.index)
@@ -20,9 +66,10 @@ class PandasModel(QAbstractTableModel):
     def data(self, index, role=Qt.DisplayRole):
         if not index.isValid() or self._df is None:
             return QVariant()
-        if role == Qt.DisplayRole:
-            val = self._df.iat[index.row(), index.column()]
-            return str(val)
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return self._cells[index.column()][self._order[index.row()]]
+        if role == Qt.TextAlignmentRole:
+            return int(self._align[index.column()])
         return QVariant()
 
     def headerData(self, section, orientation, role=Qt.DisplayRole):
@@ -32,5 +79,21 @@ class PandasModel(QAbstractTableModel):
             if orientation == Qt.Horizontal:
                 return str(self._df.columns[section])
             else:
-                return str(self._df.index[section])
+                return self._index[self._order[section]]
         return QVariant()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # reorder through an index array; the frame and string cache stay as they are
+        if self._df is None or not 0 <= column < self.columnCount():
+            return
+        ascending = order == Qt.AscendingOrder
+        col = self._df.iloc[:, column].reset_index(drop=True)
+        self.layoutAboutToBeChanged.emit()
+        try:
+            self._order = col.sort_values(ascending=ascending, kind='mergesort', na_position='last').index.to_numpy()
+        except TypeError:
+            # mixed types in one column: fall back to the rendered strings
+            self._order = np.argsort(self._cells[column], kind='stable')
+            if not ascending:
+                self._order = self._order[::-1]
+        self.layoutChanged.emit()
@@ -1,9 +1,109 @@
 # app/utils/plot_canvas.py
+import numpy as np
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
+# upper bound of drawn points per cluster; denser data is thinned on a grid
+MAX_POINTS = 20000
+GRID = (800, 400)
+
+CLUSTER_COLORS = {1: "tab:green", 2: "tab:red", 3: "tab:gray", 0: "tab:blue"}
+
+def decimate(x, y, max_points=MAX_POINTS, grid=GRID):
+    """
+    Keep one point per occupied grid cell (so outliers and the overall shape
+    survive), then thin evenly if that is still above max_points.
+    Returns the kept indices.
+    """
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+    def cell(v, bins):
+        lo, hi = v.min(), v.max()
+        if hi == lo:
+            return np.zeros(len(v), dtype=np.int64)
+        return np.minimum(((v - lo) / (hi - lo) * bins).astype(np.int64), bins - 1)
+    key = cell(x, grid[0]) * grid[1] + cell(y, grid[1])
+    _, idx = np.unique(key, return_index=True)
+    idx.sort()
+    if len(idx) > max_points:
+        idx = idx[np.linspace(0, len(idx) - 1, max_points).astype(np.int64)]
+    return idx
+
 class MplCanvas(FigureCanvas):
     def __init__(self, parent=None, width=5, height=4, dpi=100):
         fig = Figure(figsize=(width, height), dpi=dpi)
         self.axes = fig.add_subplot(111)
         super().__init__(fig)
+        self._scatters = {}     # cluster -> PathCollection, reused between plots
+        self._legend_key = None
+        self._background = None
+        self._cursor = None
+        self.mpl_connect("draw_event", self._on_draw)
+        self.mpl_connect("motion_notify_event", self._on_move)
+
+    def plot_clusters(self, ids, durations, clusters):
+        """
+        Update the cluster scatter in place: existing artists get new offsets
+        (set_offsets) instead of clearing the axes, and each cluster is
+        decimated to at most MAX_POINTS drawn points.
+        """
+        ax = self.axes
+        x = np.asarray(ids, dtype=float)
+        y = np.nan_to_num(np.asarray(durations, dtype=float))
+        labels = np.nan_to_num(np.asarray(clusters, dtype=float)).astype(int)
+        if len(x) == 0:
+            self.show_message("No data")
+            return
+        ax.set_title("Clustering Overview")
+        ax.set_xlabel("ID")
+        ax.set_ylabel("Duration (minutes)")
+        present = sorted(np.unique(labels).tolist())
+        for lab in present:
+            m = labels == lab
+            keep = decimate(x[m], y[m])
+            offsets = np.column_stack([x[m][keep], y[m][keep]])
+            sc = self._scatters.get(lab)
+            if sc is None:
+                sc = ax.scatter([], [], s=6, color=CLUSTER_COLORS.get(lab, None), label=f"Cluster {lab}")
+                self._scatters[lab] = sc
+            sc.set_offsets(offsets)
+            sc.set_visible(True)
+        for lab, sc in self._scatters.items():
+            if lab not in present:
+                sc.set_visible(False)
+        if self._legend_key != tuple(present):
+            ax.legend(handles=[self._scatters[l] for l in present])
+            self._legend_key = tuple(present)
+        pad_x = max((x.max() - x.min()) * 0.02, 1)
+        pad_y = max((y.max() - y.min()) * 0.05, 1)
+        ax.set_xlim(x.min() - pad_x, x.max() + pad_x)
+        ax.set_ylim(y.min() - pad_y, y.max() + pad_y)
+        self.draw_idle()
+
+    def show_message(self, title):
+        for sc in self._scatters.values():
+            sc.set_visible(False)
+        self.axes.set_title(title)
+        self.draw_idle()
+
+    # hover readout, redrawn with blitting so moving the mouse never re-renders the scatter
+    def _on_draw(self, event):
+        self._background = self.copy_from_bbox(self.axes.bbox)
+
+    def _on_move(self, event):
+        if self._background is None or event.inaxes is not self.axes:
+            return
+        ax = self.axes
+        if self._cursor is None:
+            self._cursor = (ax.axhline(color="0.5", lw=0.5, animated=True),
+                            ax.axvline(color="0.5", lw=0.5, animated=True),
+                            ax.text(0.01, 0.98, "", transform=ax.transAxes, va="top", fontsize=8, animated=True))
+        hline, vline, text = self._cursor
+        hline.set_ydata([event.ydata, event.ydata])
+        vline.set_xdata([event.xdata, event.xdata])
+        text.set_text(f"id {event.xdata:.0f}, {event.ydata:.0f} min")
+        self.restore_region(self._background)
+        for artist in self._cursor:
+            ax.draw_artist(artist)
+        self.blit(ax.bbox)
@@ -0,0 +1,18 @@
+# app/utils/pool.py
+# Process pools for the CPU-bound parts of the data path (parsing import files,
+# fitting cluster groups). No Qt here: the CLI runs the same code.
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+def pool_size(workers, tasks):
+    """Worker processes to start: the requested count (default: all cores), at most one per task"""
+    return max(1, min(workers or os.cpu_count() or 1, tasks))
+
+def spawn_pool(workers, initializer=None):
+    """
+    ProcessPoolExecutor whose workers are spawned, not forked: the parent may be
+    a GUI process with threads and open connections, which a fork would copy.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=initializer)
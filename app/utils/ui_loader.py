@@ -0,0 +1,57 @@
+# app/utils/ui_loader.py
+# .ui files compiled to Python once instead of parsed on every start:
+# uic.loadUi reads the XML and builds the widgets through the uic machinery each
+# time, the compiled module is plain PyQt5 calls (and uic is only imported to compile).
+# Compiled modules are cached in app/ui/__uicache__ and rebuilt when the .ui is newer.
+# usage: python -m app.utils.ui_loader   (precompile every .ui, e.g. before packaging)
+import importlib.util
+from pathlib import Path
+
+UI_DIR = Path(__file__).resolve().parents[1] / "ui"
+CACHE_DIR = UI_DIR / "__uicache__"
+
+_classes = {}
+
+def compiled_path(name):
+    return CACHE_DIR / (Path(name).stem + "_ui.py")
+
+def compile_ui(name):
+    """Compile UI_DIR/name into the cache if missing or stale; returns the module path"""
+    src, dst = UI_DIR / name, compiled_path(name)
+    # a precompiled module may be shipped without its .ui
+    if src.exists() and (not dst.exists() or dst.stat().st_mtime < src.stat().st_mtime):
+        from PyQt5 import uic
+        CACHE_DIR.mkdir(exist_ok=True)
+        tmp = dst.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            uic.compileUi(str(src), f)
+        tmp.replace(dst)
+    return dst
+
+def _ui_class(name):
+    if name not in _classes:
+        path = compile_ui(name)
+        spec = importlib.util.spec_from_file_location(f"app.ui.{path.stem}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _classes[name] = next(v for k, v in vars(module).items() if k.startswith("Ui_"))
+    return _classes[name]
+
+def load_ui(name, widget):
+    """Same result as uic.loadUi(UI_DIR / name, widget), from the compiled module"""
+    try:
+        ui_class = _ui_class(name)
+    except OSError:
+        # read-only install without a compiled module: parse the .ui as before
+        from PyQt5 import uic
+        return uic.loadUi(str(UI_DIR / name), widget)
+    ui = ui_class()
+    ui.setupUi(widget)
+    # loadUi puts the child widgets on the widget itself
+    for attr, value in vars(ui).items():
+        setattr(widget, attr, value)
+    return widget
+
+if __name__ == "__main__":
+    for path in sorted(UI_DIR.glob("*.ui")):
+        print(f"{path.name} -> {compile_ui(path.name)}")
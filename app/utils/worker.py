@@ -1,19 +1,57 @@
 # app/utils/worker.py
+import threading
+import time
 from PyQt5.QtCore import QThread, pyqtSignal
+from app.models.db import Cancelled, check_cancelled, close_connection
+
+# jobs that write to the DB (import, clustering) run one at a time
+DB_WRITE_LOCK = threading.Lock()
 
 class WorkerThread(QThread):
     finished = pyqtSignal(object)   # send result or status
     progress = pyqtSignal(int)
 
     def __init__(self, func, *args, **kwargs):
+        """
+        job=True passes progress=<callable(int)> and cancelled=<callable() -> bool>
+        to func so it can report rows done and stop between batches.
+        writes_db=True serializes the job against other DB-writing jobs.
+        """
+        self.job = kwargs.pop('job', False)
+        self.writes_db = kwargs.pop('writes_db', False)
         super().__init__()
         self.func = func
         self.args = args
         self.kwargs = kwargs
+        self.elapsed = None
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
 
     def run(self):
+        kwargs = dict(self.kwargs)
+        if self.job:
+            kwargs['progress'] = self.progress.emit
+            kwargs['cancelled'] = self.is_cancelled
+        start = time.perf_counter()
         try:
-            result = self.func(*self.args, **self.kwargs)
-            self.finished.emit(result)
+            if self.writes_db:
+                with DB_WRITE_LOCK:
+                    # may have been cancelled while waiting for the lock
+                    check_cancelled(self.is_cancelled)
+                    result = self.func(*self.args, **kwargs)
+            else:
+                result = self.func(*self.args, **kwargs)
+        except Cancelled:
+            result = {"cancelled": True}
         except Exception as e:
-            self.finished.emit({"error": str(e)})
+            result = {"error": str(e)}
+        finally:
+            self.elapsed = time.perf_counter() - start
+            # the pooled connection belongs to this thread
+            close_connection()
+        self.finished.emit(result)
@@ -0,0 +1,66 @@
+# benchmarks/bench_cluster_writeback.py
+# Per-row UPDATE loop (old run_kmeans_and_save write-back) vs write_clusters,
+# with UPDATE ... FROM and with the pre-3.33 subquery form (forced through
+# clustering.UPDATE_FROM). Both bulk forms must leave exactly the given labels.
+# usage: python -m benchmarks.bench_cluster_writeback [rows ...]   (exit status 1 on wrong labels)
+import sys
+import time
+import tempfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import app.models.db as db
+from app.models import clustering
+from app.models.clustering import write_clusters
+from benchmarks.common import make_db
+
+def labels(n, seed):
+    rng = np.random.default_rng(seed)
+    return np.arange(1, n + 1), rng.integers(1, 3, n)
+
+def per_row(conn, ids, clusters):
+    # same shape as the old loop: iterrows over the labelled frame
+    active = pd.DataFrame({'id': ids, 'klabel': clusters})
+    cur = conn.cursor()
+    for _, row in active.iterrows():
+        cur.execute("UPDATE aktivitas SET cluster = ? WHERE id = ?", (int(row['klabel']), int(row['id'])))
+    conn.commit()
+
+def pre_333(conn, ids, clusters):
+    saved, clustering.UPDATE_FROM = clustering.UPDATE_FROM, False
+    try:
+        write_clusters(conn, ids, clusters)
+    finally:
+        clustering.UPDATE_FROM = saved
+
+def timed(func, path, n, seed):
+    """(seconds, labels left in the table match the given ones)"""
+    db.DB_PATH = path
+    conn = db.get_connection()
+    ids, clusters = labels(n, seed)
+    t0 = time.perf_counter()
+    func(conn, ids, clusters)
+    elapsed = time.perf_counter() - t0
+    stored = np.array([r[0] for r in conn.execute("SELECT cluster FROM aktivitas ORDER BY id")])
+    conn.close()
+    return elapsed, np.array_equal(stored, clusters)
+
+def main(sizes):
+    failed = 0
+    print(f"{'rows':>10} {'per-row (s)':>12} {'bulk (s)':>10} {'pre-3.33 (s)':>13} {'speedup':>8}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "bench.db"
+            make_db(path, n)
+            old, _ = timed(per_row, path, n, 1)
+            new, ok_new = timed(write_clusters, path, n, 2)
+            fallback, ok_fallback = timed(pre_333, path, n, 3)
+            db.close_connection()
+        wrong = [name for name, ok in (("bulk", ok_new), ("pre-3.33", ok_fallback)) if not ok]
+        failed += len(wrong)
+        print(f"{n:>10} {old:>12.3f} {new:>10.3f} {fallback:>13.3f} {old / new:>7.1f}x"
+              + (f"  wrong labels: {', '.join(wrong)}" if wrong else ""))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main([int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]))
@@ -0,0 +1,59 @@
+# benchmarks/bench_pdf_export.py
+# Old export_df_to_pdf (whole frame, one Table) vs streaming export_report_pdf.
+# Each run is a separate process so peak RSS is per scenario.
+# usage: python -m benchmarks.bench_pdf_export [rows ...] [--legacy-max N]
+# The legacy exporter grows super-linearly (minutes at 50k rows), so it is
+# skipped above --legacy-max rows (default 100000).
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+import app.models.db as db
+from benchmarks.common import make_db, peak_rss_mb
+
+SCENARIOS = ["legacy", "stream", "stream-compact"]
+
+def run_one(scenario, db_path, out):
+    db.DB_PATH = Path(db_path)
+    t0 = time.perf_counter()
+    if scenario == "legacy":
+        from app.controllers.aktivitas import list_activities
+        from app.utils.export_pdf import export_df_to_pdf
+        export_df_to_pdf(list_activities(), out, "Activity Report")
+    else:
+        from app.controllers.report import export_report_pdf
+        export_report_pdf(out, compact=scenario == "stream-compact")
+    print(json.dumps({"seconds": time.perf_counter() - t0, "peak_rss_mb": peak_rss_mb()}))
+
+def main(sizes, legacy_max=100_000):
+    print(f"{'rows':>8} {'scenario':>15} {'seconds':>9} {'peak RSS (MB)':>14}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "bench.db"
+            make_db(path, n)
+            db.close_connection()
+            for scenario in SCENARIOS:
+                if scenario == "legacy" and n > legacy_max:
+                    print(f"{n:>8} {scenario:>15} {'skipped':>9}")
+                    continue
+                res = subprocess.run([sys.executable, "-m", "benchmarks.bench_pdf_export", "--one", scenario,
+                                      str(path), str(Path(tmp) / f"{scenario}.pdf")],
+                                     capture_output=True, text=True)
+                if res.returncode != 0:
+                    print(f"{n:>8} {scenario:>15} failed: {res.stderr.strip().splitlines()[-1:]}")
+                    continue
+                r = json.loads(res.stdout.strip().splitlines()[-1])
+                print(f"{n:>8} {scenario:>15} {r['seconds']:>9.2f} {r['peak_rss_mb']:>14.0f}")
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--one"]:
+        run_one(*sys.argv[2:5])
+    else:
+        ap = argparse.ArgumentParser()
+        ap.add_argument("rows", nargs="*", type=int, default=[10_000, 100_000, 500_000])
+        ap.add_argument("--legacy-max", type=int, default=100_000)
+        args = ap.parse_args()
+        main(args.rows, args.legacy_max)
@@ -0,0 +1,67 @@
+# benchmarks/cli_startup.py
+# Cold-start check for the headless CLI: each command runs in a fresh
+# interpreter under -X importtime on a small DB. A command fails when it
+# loads a module it must not (Qt, matplotlib, ReportLab outside export-pdf)
+# or when its best wall time is over its budget.
+# usage: python -m benchmarks.cli_startup [--repeat R] [--scale F]   (exit status 1 on a failure)
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.common import make_db
+
+ROOT = Path(__file__).resolve().parents[1]
+ROWS = 2000
+
+FORBIDDEN = ("PyQt5", "matplotlib", "reportlab")
+# (name, argv, modules it may load of FORBIDDEN, wall-time budget in seconds)
+COMMANDS = [
+    ("help", ["--help"], (), 0.5),
+    ("cluster", ["cluster", "--mode", "full"], (), 2.5),
+    ("summary", ["summary", "--by", "aplikasi"], (), 2.0),
+    ("export-excel", ["export-excel", "{tmp}/report.xlsx"], (), 3.0),
+    ("export-pdf", ["export-pdf", "{tmp}/report.pdf"], ("reportlab",), 4.0),
+]
+
+def run(argv, dbfile, tmp):
+    cmd = [sys.executable, "-X", "importtime", "-m", "app.cli", "--db", str(dbfile)]
+    cmd += [a.format(tmp=tmp) for a in argv]
+    env = dict(os.environ, AKTIVITAS_METRICS="0")
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+    seconds = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} exited {proc.returncode}:\n{proc.stderr[-2000:]}")
+    modules = set()
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            modules.add(name.split(".")[0])
+    return seconds, modules
+
+def main(repeat, scale):
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        dbfile = Path(tmp) / "cli.db"
+        make_db(dbfile, ROWS)
+        for name, argv, allowed, budget in COMMANDS:
+            best, modules = min(run(argv, dbfile, tmp) for _ in range(repeat))
+            loaded = sorted(m for m in FORBIDDEN if m in modules and m not in allowed)
+            over = best > budget * scale
+            failed += bool(loaded or over)
+            note = ("loads " + ", ".join(loaded) if loaded else "") + (" over budget" if over else "")
+            print(f"{'FAIL' if loaded or over else 'ok':>4}  {name:<14} {best:>6.2f}s "
+                  f"(budget {budget * scale:.2f}s) {len(modules):>4} top-level modules  {note}")
+    print(f"{failed} failure(s)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--scale", type=float, default=1.0, help="multiply every budget (slow machines)")
+    args = ap.parse_args()
+    sys.exit(main(args.repeat, args.scale))
@@ -0,0 +1,30 @@
+# benchmarks/common.py
+import numpy as np
+import app.models.db as db
+
+def make_db(path, n, seed=42):
+    """Fresh DB at path with n simple aktivitas rows; DB_PATH is pointed at it"""
+    db.DB_PATH = path
+    db.init_db()
+    conn = db.get_connection()
+    rng = np.random.default_rng(seed)
+    dur = rng.integers(0, 600, n)
+    apps = np.array(["SAM SNS", "SAM PS", "SAM MD"])[rng.integers(0, 3, n)]
+    conn.executemany("""
+        INSERT INTO aktivitas (tanggal, aplikasi, start_scheduler, finish_bridge, duration_minutes, status)
+        VALUES (?,?,?,?,?,?)""",
+        (_row(i, a, int(d)) for i, (a, d) in enumerate(zip(apps.tolist(), dur))))
+    conn.commit()
+
+DAY0 = 19723  # 2024-01-01 as a day number
+
+def _row(i, app, dur):
+    # distinct (tanggal, start_scheduler) for the first 28 * 86400 rows
+    day = DAY0 + i % 28
+    start = day * 86400 + (i // 28) % 86400
+    return (day, app, start, start, dur, "ok")
+
+def peak_rss_mb():
+    # Linux reports ru_maxrss in KB
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
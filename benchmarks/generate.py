@@ -0,0 +1,84 @@
+# benchmarks/generate.py
+# Synthetic scheduler exports shaped like the real ones: the same header
+# spellings, time cells as "1 jam 32 menit 20 detik", HH:MM:SS, HH.MM and
+# Excel day fractions, runs that finish after midnight, and blank cells.
+# usage: python -m benchmarks.generate out.xlsx|out.csv [rows] [--seed N] [--days N]
+import argparse
+import numpy as np
+import pandas as pd
+
+APLIKASI = ["SAM SNS", "SAM PS", "SAM MD", "SAM FIN", "SAM HR", "SAM WMS"]
+STATUS = ["Success", "Success", "Success", "Failed", "Warning"]
+HEADER = ["Tanggal", "Aplikasi", "Start Scheduler", "Scheduller Finish",
+          "Start Bridge", "Finish Bridge", "Status", "Keterangan"]
+
+# share of time cells written in each style (the rest are HH:MM:SS)
+STYLE_SHARE = {"jam": 0.15, "dot": 0.15, "fraction": 0.10}
+MISSING_SHARE = 0.03     # blank time / status cells
+OVERNIGHT_SHARE = 0.05   # runs started late in the evening that end after midnight
+
+def _clock(secs, styles):
+    # seconds since midnight -> cell text / number in the given style
+    secs = np.asarray(secs) % 86400
+    h, m, s = secs // 3600, secs // 60 % 60, secs % 60
+    out = np.empty(len(secs), dtype=object)
+    for i, style in enumerate(styles):
+        if style == "jam":
+            out[i] = f"{h[i]} jam {m[i]} menit {s[i]} detik"
+        elif style == "dot":
+            out[i] = f"{h[i]:02d}.{m[i]:02d}"
+        elif style == "fraction":
+            out[i] = (secs[i] or 1) / 86400
+        else:
+            out[i] = f"{h[i]:02d}:{m[i]:02d}:{s[i]:02d}"
+    return out
+
+def generate(rows, seed=0, days=30, start="2024-01-01"):
+    """DataFrame with rows scheduler-export rows spread over days days"""
+    rng = np.random.default_rng(seed)
+    tanggal = pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, rows), unit="D")
+    start_s = rng.integers(0, 86400, rows)
+    late = rng.random(rows) < OVERNIGHT_SHARE
+    start_s[late] = rng.integers(22 * 3600, 86400, late.sum())
+    # scheduler 1-40 min, bridge starts 0-10 min after it and runs a lognormal while
+    sched_end = start_s + rng.integers(60, 2400, rows)
+    bridge_s = start_s + rng.integers(0, 600, rows)
+    bridge_end = bridge_s + np.clip(rng.lognormal(7.0, 1.0, rows), 60, 6 * 3600).astype(np.int64)
+    choices = list(STYLE_SHARE) + ["hms"]
+    weights = list(STYLE_SHARE.values()) + [1 - sum(STYLE_SHARE.values())]
+
+    def cells(secs):
+        col = _clock(secs, rng.choice(choices, rows, p=weights))
+        col[rng.random(rows) < MISSING_SHARE] = None
+        return col
+
+    df = pd.DataFrame({
+        "Tanggal": tanggal.strftime("%Y-%m-%d"),
+        "Aplikasi": rng.choice(APLIKASI, rows),
+        "Start Scheduler": cells(start_s),
+        "Scheduller Finish": cells(sched_end),
+        "Start Bridge": cells(bridge_s),
+        "Finish Bridge": cells(bridge_end),
+        "Status": rng.choice(STATUS, rows).astype(object),
+        "Keterangan": None,
+    }, columns=HEADER)
+    df.loc[rng.random(rows) < MISSING_SHARE, "Status"] = None
+    df.loc[rng.random(rows) < 0.02, "Keterangan"] = "rerun"
+    return df
+
+def write(df, path):
+    if str(path).lower().endswith(".csv"):
+        df.to_csv(path, index=False)
+    else:
+        df.to_excel(path, index=False)
+    return path
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("out")
+    ap.add_argument("rows", nargs="?", type=int, default=10_000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--days", type=int, default=30)
+    args = ap.parse_args()
+    write(generate(args.rows, args.seed, args.days), args.out)
+    print(f"{args.rows} rows -> {args.out}")
@@ -0,0 +1,84 @@
+# benchmarks/gui_startup.py
+# Startup budget check for the GUI: `import app.main` runs in a fresh interpreter
+# under -X importtime. It fails when a module that should only load on first
+# use (pandas, numpy, matplotlib, ReportLab, sklearn, bcrypt, uic) is imported,
+# or when the import of app.main is over its budget. When app/ui holds the .ui
+# files, the time from QApplication to a shown MainWindow (offscreen) is checked too.
+# usage: python -m benchmarks.gui_startup [--repeat R] [--scale F]   (exit status 1 on a failure)
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+DEFERRED = ("pandas", "numpy", "matplotlib", "reportlab", "sklearn", "bcrypt", "PyQt5.uic")
+IMPORT_BUDGET = 0.35   # seconds, cumulative import time of app.main
+WINDOW_BUDGET = 0.5    # seconds, QApplication -> MainWindow shown
+
+SHOW_WINDOW = """
+import sys, time, tempfile
+from pathlib import Path
+import app.models.db as db
+db.DB_PATH = Path(tempfile.mkdtemp()) / "gui.db"
+db.init_db()
+from PyQt5.QtWidgets import QApplication
+import app.main as m
+app = QApplication(sys.argv)
+t0 = time.perf_counter()
+w = m.MainWindow({"id": 1, "username": "admin", "role": "admin", "nama": "Administrator"})
+w.show()
+app.processEvents()
+print(time.perf_counter() - t0)
+"""
+
+def import_times():
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=ROOT,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if line.startswith("import time:") and "|" in line:
+            _, cum, name = line[len("import time:"):].split("|")
+            if cum.strip().isdigit():
+                cumulative[name.strip()] = int(cum) / 1e6
+    return cumulative
+
+def window_seconds():
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen", AKTIVITAS_METRICS="0")
+    proc = subprocess.run([sys.executable, "-c", SHOW_WINDOW], cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return float(proc.stdout.split()[-1])
+
+def main(repeat, scale):
+    failed = 0
+    runs = [import_times() for _ in range(repeat)]
+    best = min(runs, key=lambda r: r.get("app.main", float("inf")))
+    loaded = sorted(m for m in DEFERRED if m in best)
+    seconds = best["app.main"]
+    over = seconds > IMPORT_BUDGET * scale
+    failed += bool(loaded) + over
+    print(f"{'FAIL' if loaded or over else 'ok':>4}  import app.main  {seconds:.3f}s (budget {IMPORT_BUDGET * scale:.2f}s)"
+          + (f"  loads {', '.join(loaded)}" if loaded else ""))
+    for name, secs in sorted(best.items(), key=lambda kv: -kv[1])[1:6]:
+        print(f"      {name:<40} {secs:.3f}s")
+    if (ROOT / "app" / "ui" / "mainwindow.ui").exists():
+        seconds = min(window_seconds() for _ in range(repeat))
+        over = seconds > WINDOW_BUDGET * scale
+        failed += over
+        print(f"{'FAIL' if over else 'ok':>4}  MainWindow shown {seconds:.3f}s (budget {WINDOW_BUDGET * scale:.2f}s)")
+    else:
+        print("  --  MainWindow shown: skipped (no app/ui/mainwindow.ui)")
+    print(f"{failed} failure(s)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--scale", type=float, default=1.0, help="multiply every budget (slow machines)")
+    args = ap.parse_args()
+    sys.exit(main(args.repeat, args.scale))
@@ -0,0 +1,57 @@
+# benchmarks/parse_parity.py
+# Parity check of the column-wise time parser against the per-cell one:
+# parse_time_column must give parse_time_value's result for every cell of a
+# generated export (clock styles, "jam menit detik", Excel day fractions, blanks)
+# mixed with garbage and edge cells, whether the column arrives as numbers and
+# text (xlsx / read_csv) or as text only (read_csv dtype=str).
+# usage: python -m benchmarks.parse_parity [rows]   (exit status 1 on a mismatch)
+import sys
+import tempfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from app.models.importer import parse_time_value, parse_time_column, TIME_KINDS, CLOCK_LAYOUTS
+from benchmarks.generate import generate, write
+
+COLUMNS = ["Start Scheduler", "Scheduller Finish", "Start Bridge", "Finish Bridge"]
+# cells worth checking on their own: boundaries, near-boundary fractions, garbage
+EDGE = ["00:00:00", "23:59:59", "24:00", "7", "07.30", "7,30", "1 jam", "90 menit", "abc", "", " ",
+        "0.5", "0.9999999", "1e-05", "1.0", "0", "-0.25", "nan", 0.5, 0.0416666666666667, 1 / 86400,
+        37732 / 86400, 1, 2.5, None]
+
+def sources(rows, tmp):
+    """(name, frame) pairs holding the same cells as different dtypes"""
+    df = generate(rows, seed=rows)
+    rng = np.random.default_rng(rows)
+    for col in COLUMNS:
+        pick = rng.random(rows) < 0.05
+        df.loc[pick, col] = rng.choice(np.array(EDGE, dtype=object), pick.sum())
+    yield "frame", df
+    path = write(df, str(Path(tmp) / "parity.csv"))
+    yield "csv", pd.read_csv(path)
+    yield "csv str", pd.read_csv(path, dtype=str)
+
+def mismatches(values, ref, kinds):
+    vec = parse_time_column(values, ref, kinds)
+    base = pd.Series([parse_time_value(v, r) for v, r in zip(values, ref)], index=values.index,
+                     dtype='datetime64[ns]')
+    return ((vec != base) & ~(vec.isna() & base.isna())) | (vec.isna() != base.isna())
+
+def main(rows):
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, df in sources(rows, tmp):
+            ref = pd.to_datetime(df["Tanggal"])
+            for col in COLUMNS:
+                # the full order and the narrowed orders an import template can pass
+                for kinds in (TIME_KINDS, ('fraction',), CLOCK_LAYOUTS[:1]):
+                    bad = mismatches(df[col], ref, kinds)
+                    failed += bool(bad.any())
+                    sample = ", ".join(repr(v) for v in df[col][bad].head(3))
+                    print(f"{'FAIL' if bad.any() else 'ok':>4}  {name:<8} {col:<18} {'+'.join(kinds):<30} "
+                          f"{int(bad.sum())}/{len(df)}" + (f"  e.g. {sample}" if sample else ""))
+    print(f"{failed} mismatch(es)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 3000))
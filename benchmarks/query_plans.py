@@ -0,0 +1,61 @@
+# benchmarks/query_plans.py
+# Query-plan regression check for the list_activities / count_activities / page shapes:
+# every filter combination must be answered through an index, without a full table
+# scan and without a temp B-tree sort for the ORDER BY.
+# usage: python -m benchmarks.query_plans [rows]   (exit status 1 on a regression)
+import sys
+import tempfile
+from itertools import combinations
+from pathlib import Path
+import app.models.db as db
+from app.controllers.aktivitas import activities_query, _filter_sql
+from app.models.timestamps import text_select
+from benchmarks.common import make_db
+
+FILTERS = {'date_from': '2024-01-05', 'date_to': '2024-01-20', 'aplikasi': 'SAM PS', 'cluster': 2}
+
+def shapes():
+    """(name, sql, params) for every filter combination"""
+    for r in range(len(FILTERS) + 1):
+        for keys in combinations(FILTERS, r):
+            filters = {k: FILTERS[k] for k in keys}
+            name = "+".join(keys) or "no filter"
+            q, params = activities_query(filters)
+            yield f"list   {name}", q, params
+            q, params = activities_query(filters, text_select(db.AKTIVITAS_COLUMNS))
+            yield f"export {name}", q, params
+            where, params = _filter_sql(filters)
+            yield f"count  {name}", "SELECT COUNT(*) FROM aktivitas WHERE 1=1" + where, params
+            yield (f"page   {name}",
+                   f"SELECT {text_select(db.AKTIVITAS_COLUMNS)} FROM aktivitas WHERE 1=1" + where
+                   + " AND tanggal <= ? AND (tanggal < ? OR id < ?) ORDER BY aktivitas.tanggal DESC, id DESC LIMIT 500",
+                   params + [19732, 19732, 1000])
+
+def problems(plan, name):
+    found = []
+    for detail in plan:
+        if detail.startswith("SCAN aktivitas") and "INDEX" not in detail and not name.endswith(" no filter"):
+            found.append(detail)
+        if "TEMP B-TREE" in detail:
+            found.append(detail)
+    return found
+
+def main(n):
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        make_db(Path(tmp) / "plans.db", n)
+        conn = db.get_connection()
+        conn.execute("UPDATE aktivitas SET cluster = 1 + id % 3")
+        conn.execute("ANALYZE")
+        conn.commit()
+        for name, q, params in shapes():
+            plan = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + q, params)]
+            bad = problems(plan, name)
+            failed += bool(bad)
+            print(f"{'FAIL' if bad else 'ok':>4}  {name:<45} {' | '.join(plan)}")
+        db.close_connection()
+    print(f"{failed} regression(s)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
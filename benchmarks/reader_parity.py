@@ -0,0 +1,69 @@
+# benchmarks/reader_parity.py
+# Parity check of the streaming xlsx reader (iter_frames / openpyxl read-only)
+# against pd.read_excel on awkward headers: repeated names (two "Keterangan"),
+# a repeat that clashes with an existing "X.1", blank header cells. Column names
+# and cell values must match, and import_from_file must store every row (and
+# report a second, unforced import of the same file as skipped, not 0 rows).
+# usage: python -m benchmarks.reader_parity   (exit status 1 on a mismatch)
+import sys
+import tempfile
+from pathlib import Path
+import pandas as pd
+import app.models.db as db
+from app.models.importer import iter_frames, import_from_file
+
+ROWS = [["2024-01-02", "SAM PS", "08:00:00", "08:05:00", "09:00:00", "ok", "first", "second", "x", "y"],
+        ["2024-01-02", "SAM MD", "10:00:00", "10:01:00", "10:30:00", "ok", None, "only second", "x", None],
+        ["2024-01-03", "SAM SNS", None, None, None, None, "pending", None, None, "z"]]
+
+HEADERS = {
+    "duplicate notes": ["Tanggal", "Aplikasi", "Start Scheduler", "Start Bridge", "Finish Bridge", "Status",
+                        "Keterangan", "Keterangan", "Extra", "Extra"],
+    "clash with .1": ["Tanggal", "Aplikasi", "Start Scheduler", "Start Bridge", "Finish Bridge", "Status",
+                      "Keterangan", "Keterangan", "Keterangan.1", "Keterangan"],
+    "blank headers": ["Tanggal", "Aplikasi", "Start Scheduler", "Start Bridge", "Finish Bridge", "Status",
+                      "Keterangan", None, None, "Keterangan"],
+}
+
+def write_xlsx(path, header, rows):
+    from openpyxl import Workbook
+    wb = Workbook()
+    ws = wb.active
+    ws.append(header)
+    for r in rows:
+        ws.append(r)
+    wb.save(path)
+
+def main():
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "reader.db"
+        db.init_db()
+        for i, (name, header) in enumerate(HEADERS.items()):
+            path = str(Path(tmp) / f"reader_{i}.xlsx")
+            write_xlsx(path, header, ROWS)
+            expected = pd.read_excel(path)
+            problems = []
+            try:
+                got = pd.concat(list(iter_frames(path)), ignore_index=True)
+                if list(got.columns) != list(expected.columns):
+                    problems.append(f"columns {list(got.columns)} != {list(expected.columns)}")
+                elif not got.astype(object).where(got.notna(), None).equals(
+                        expected.astype(object).where(expected.notna(), None)):
+                    problems.append("cell values differ")
+                stored = import_from_file(path, force=True)
+                if stored != len(ROWS):
+                    problems.append(f"import stored {stored} of {len(ROWS)} rows")
+                again = import_from_file(path)
+                if again is not None:
+                    problems.append(f"re-import returned {again!r}, not skipped")
+            except Exception as e:
+                problems.append(f"{type(e).__name__}: {e}")
+            failed += bool(problems)
+            print(f"{'FAIL' if problems else 'ok':>4}  {name:<16} {'; '.join(problems)}")
+        db.close_connection()
+    print(f"{failed} mismatch(es)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
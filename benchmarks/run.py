@@ -0,0 +1,154 @@
+# benchmarks/run.py
+# Headless timing suite: import, clustering, list_activities per filter
+# combination and the report exports, on generated scheduler exports
+# (benchmarks/generate.py). Results go to a JSON file so runs can be compared.
+# usage: python -m benchmarks.run [--rows N ...] [--only import,cluster,...]
+#                                 [--repeat R] [--out file.json] [--compare old.json]
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from itertools import combinations
+from pathlib import Path
+import pandas as pd
+# timings here are the suite's own; keep the metrics table out of the measured path
+os.environ.setdefault("AKTIVITAS_METRICS", "0")
+import app.models.db as db
+from app.models import colcache
+from benchmarks.common import peak_rss_mb
+from benchmarks.generate import generate, write
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+SUITES = ("import", "cluster", "query", "export")
+# export_df_to_pdf builds one platypus Table and grows super-linearly
+LEGACY_PDF_MAX = 20_000
+
+FILTERS = {'date_from': '2024-01-05', 'date_to': '2024-01-20', 'aplikasi': 'SAM PS', 'cluster': 2}
+
+def _timed(func, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - t0)
+    return min(times), sorted(times)[len(times) // 2], result
+
+def _fresh_db(path):
+    db.close_connection()
+    for p in Path(path).parent.glob(Path(path).name + "*"):
+        shutil.rmtree(p) if p.is_dir() else p.unlink()
+    db.DB_PATH = Path(path)
+    db.init_db()
+
+def run_size(rows, suites, repeat, tmp):
+    from app.models.importer import import_from_file
+    from app.models.clustering import run_kmeans_and_save
+    from app.controllers.aktivitas import list_activities
+    from app.controllers.report import export_report_excel
+    from app.utils.export_pdf import export_df_to_pdf
+
+    out = []
+
+    def add(scenario, func, n_repeat=repeat, **extra):
+        best, median, res = _timed(func, n_repeat)
+        out.append(dict(scenario=scenario, rows=rows, best_s=round(best, 4), median_s=round(median, 4),
+                        repeat=n_repeat, peak_rss_mb=round(peak_rss_mb(), 1), **extra))
+        print(f"{rows:>9} {scenario:<52} {best:>9.3f}s")
+        return res
+
+    df = generate(rows, seed=rows)
+    files = {ext: write(df, str(Path(tmp) / f"export_{rows}.{ext}")) for ext in ("csv", "xlsx")}
+    dbfile = Path(tmp) / f"bench_{rows}.db"
+
+    def reimport(path):
+        _fresh_db(dbfile)
+        return import_from_file(path)
+
+    if "import" in suites:
+        for ext, path in files.items():
+            add(f"import_from_file {ext}", lambda: reimport(path))
+    # the remaining suites work on the csv import
+    reimport(files["csv"])
+    if "cluster" in suites:
+        def full():
+            return run_kmeans_and_save(mode="full")
+
+        def incremental():
+            with db.transaction() as conn:
+                conn.execute("UPDATE aktivitas SET cluster = NULL WHERE id % 10 = 0")
+                colcache.touch(conn, "cluster_gen")
+            return run_kmeans_and_save(mode="incremental")
+        add("run_kmeans_and_save full", full)
+        add("run_kmeans_and_save incremental (10% new)", incremental)
+        add("run_kmeans_and_save grouped aplikasi", lambda: run_kmeans_and_save(mode="grouped"))
+        add("run_kmeans_and_save grouped aplikasi,depo +lag,start_hour",
+            lambda: run_kmeans_and_save(mode="grouped", backend="kmeans", group_by=("aplikasi", "depo"),
+                                        features=("duration", "lag", "start_hour")))
+    else:
+        run_kmeans_and_save(mode="full")
+    if "query" in suites:
+        for r in range(len(FILTERS) + 1):
+            for keys in combinations(FILTERS, r):
+                filters = {k: FILTERS[k] for k in keys}
+                n = add(f"list_activities {'+'.join(keys) or 'no filter'}", lambda: len(list_activities(filters)))
+                out[-1]["result_rows"] = n
+    if "export" in suites:
+        add("export_report_excel", lambda: export_report_excel(str(Path(tmp) / "report.xlsx")))
+        if rows <= LEGACY_PDF_MAX:
+            add("export_df_to_pdf", lambda: export_df_to_pdf(list_activities(), str(Path(tmp) / "report.pdf")), 1)
+        else:
+            print(f"{rows:>9} {'export_df_to_pdf':<52} {'skipped':>10} (> {LEGACY_PDF_MAX} rows)")
+    db.close_connection()
+    return out
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).resolve().parent).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "pandas": pd.__version__,
+            "sqlite": sqlite3.sqlite_version, "commit": commit, "date": datetime.now().isoformat(timespec='seconds')}
+
+def compare(results, old_path):
+    old = {(r["scenario"], r["rows"]): r for r in json.loads(Path(old_path).read_text())["results"]}
+    print(f"\n{'rows':>9} {'scenario':<52} {'old (s)':>9} {'new (s)':>9} {'ratio':>7}")
+    for r in results:
+        o = old.get((r["scenario"], r["rows"]))
+        if o:
+            ratio = r["best_s"] / o["best_s"] if o["best_s"] else float("nan")
+            print(f"{r['rows']:>9} {r['scenario']:<52} {o['best_s']:>9.3f} {r['best_s']:>9.3f} {ratio:>6.2f}x")
+
+def main(sizes, suites, repeat, out_path=None, compare_to=None):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            results += run_size(rows, suites, repeat, tmp)
+    if out_path is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        out_path = RESULTS_DIR / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    Path(out_path).write_text(json.dumps({"environment": environment(), "results": results}, indent=2))
+    print(f"results -> {out_path}")
+    if compare_to:
+        compare(results, compare_to)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", nargs="+", type=int, default=[10_000, 100_000])
+    ap.add_argument("--only", default=",".join(SUITES), help="comma separated subset of " + ", ".join(SUITES))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out")
+    ap.add_argument("--compare")
+    args = ap.parse_args()
+    suites = [s for s in args.only.split(",") if s]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        ap.error(f"unknown suite(s): {', '.join(sorted(unknown))}")
+    main(args.rows, suites, args.repeat, args.out, args.compare)